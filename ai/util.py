@@ -1,11 +1,18 @@
 import webcolors
 import pandas as pd
 import numpy as np
+import sys
 import time
 import json
 import matplotlib.pyplot as plt
 import cv2 as c2
-from sklearn.cluster import KMeans
+from pathlib import Path
+
+# One dominant color engine for these scripts and the segmentation Lambda;
+# it lives with the Lambda source, so moving color.py means updating this path
+SEGMENT_SRC = Path(__file__).resolve().parent.parent / "aws" / "lib" / "lambdas" / "ai-image-processing" / "segment" / "src"
+sys.path.insert(0, str(SEGMENT_SRC))
+from color import dominant_color
 
 
 def map_to_category_label(id):
@@ -63,22 +70,8 @@ def rgb_to_color_name(rgb_color):
         return closest_color
 
 
-def detect_dominant_color(image, k=4):
-    # Reshape the image to be a list of pixels
-    pixels = image.reshape((-1, 3))
-    # Apply K-means clustering to find the dominant color
-    kmeans = KMeans(n_clusters=1)
-    kmeans.fit(pixels)
-    dominant_color = kmeans.cluster_centers_[0].astype(int)
-
-    # Prepare the JSON output
-    color_data = {
-        "red": int(dominant_color[2]),
-        "green": int(dominant_color[1]),
-        "blue": int(dominant_color[0]),
-    }
-
-    return color_data
+def detect_dominant_color(image):
+    return dominant_color(image)
 
 
 def detections_to_dataframe(results, class_names, thres):
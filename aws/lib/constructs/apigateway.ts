@@ -249,6 +249,9 @@ export class ApigatewayConstruct extends Construct {
       {
         authorizer: CognitoConstruct.authorizer,
         operationName: "SearchUsers",
+        requestParameters: {
+          "method.request.querystring.mode": false, // "typeahead" for prefix matches ranked by followers
+        },
       }
     );
 
@@ -342,6 +345,7 @@ export class ApigatewayConstruct extends Construct {
         requestParameters: {
           "method.request.path.uuid": true,
           "method.request.querystring.limit": false,
+          "method.request.querystring.cursor": false,
         },
       }
     );
@@ -543,6 +547,29 @@ export class ApigatewayConstruct extends Construct {
       }
     );
 
+    // Define the /items/search resource
+    const searchItems = items.addResource("search");
+    // GET /items/search - filter posts by item tags, type, brand, category, price and color
+    searchItems.addMethod(
+      "GET",
+      new LambdaIntegration(lambdaConstruct.itemLambdas["searchItemsLambda"]),
+      {
+        authorizer: CognitoConstruct.authorizer,
+        operationName: "SearchItems",
+        requestParameters: {
+          "method.request.querystring.tags": false, // Comma separated, all required
+          "method.request.querystring.itemType": false,
+          "method.request.querystring.brand": false,
+          "method.request.querystring.category": false,
+          "method.request.querystring.minPrice": false,
+          "method.request.querystring.maxPrice": false,
+          "method.request.querystring.color": false, // Hex without '#'
+          "method.request.querystring.maxColorDistance": false,
+          "method.request.querystring.limit": false,
+        },
+      }
+    );
+
     // Define the /items/{item-id} resource
     const itemID = items.addResource("{item-id}");
 
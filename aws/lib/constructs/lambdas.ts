@@ -87,6 +87,7 @@ export class LambdasConstruct extends Construct {
       handlerPath: string,
       functionName: string,
       inVpc? : boolean,
+      queryBudget? : number,
     ) => {
       const shouldUseVpc = inVpc ?? true;
       const l = new Function(this, id, {
@@ -106,10 +107,13 @@ export class LambdasConstruct extends Construct {
             databaseConstuct.dbInstance.secret?.secretFullArn || "",
           DB_PORT: "3306",
           DB_NAME: databaseConstuct.databaseName,
+          DB_SECRET_TTL_SECONDS: "900",
           REGION: process.env.CDK_DEFAULT_REGION || "us-east-1",
           SSL_CERT_FILE: "/opt/python/etc/ssl/certs/global-bundle.pem",
           USER_POOL_CLIENT_ID: cognitoConstruct.userPoolClient.userPoolClientId,
-          USER_POOL_ID: cognitoConstruct.userPool.userPoolId
+          USER_POOL_ID: cognitoConstruct.userPool.userPoolId,
+          // Max SQL statements per invocation before session_handler logs it as over budget
+          ...(queryBudget ? { QUERY_BUDGET: String(queryBudget) } : {}),
         },
         layers: [sharedLayer],
       });
@@ -235,7 +239,9 @@ export class LambdasConstruct extends Construct {
       getFeedLambda: createLambda(
         "GetFeedLambda",
         "lib/lambdas/api-endpoints/feed/get-feed",
-        "handler"
+        "handler",
+        true,
+        12
       ),
     };
 
@@ -268,7 +274,9 @@ export class LambdasConstruct extends Construct {
       getPostsByUserIdLambda: createLambda(
         "GetPostsByUserIdLambda",
         "lib/lambdas/api-endpoints/post/get-posts-by-user-id",
-        "handler"
+        "handler",
+        true,
+        8
       ),
       publishPostLambda: createLambda(
         "PublishPostLambda",
@@ -278,7 +286,9 @@ export class LambdasConstruct extends Construct {
       searchPostsLambda: createLambda(
         "searchPostsLambda",
         "lib/lambdas/api-endpoints/post/search-posts",
-        "handler"
+        "handler",
+        true,
+        8
       ),
     };
 
@@ -331,6 +341,11 @@ export class LambdasConstruct extends Construct {
         "lib/lambdas/api-endpoints/item/update-details",
         "handler"
       ),
+      searchItemsLambda: createLambda(
+        "searchItemsLambda",
+        "lib/lambdas/api-endpoints/item/search-items",
+        "handler"
+      ),
     };
 
     this.followLambdas = {
@@ -401,7 +416,9 @@ export class LambdasConstruct extends Construct {
       getBookmarksLambda: createLambda(
         "GetBookmarksLambda",
         "lib/lambdas/api-endpoints/bookmark/get-bookmarks",
-        "handler"
+        "handler",
+        true,
+        8
       ),
     };
 
@@ -420,7 +437,9 @@ export class LambdasConstruct extends Construct {
 
     aiLambdas.addAiResultsToDb.addEventSource(
       new SqsEventSource(classificationQueue, {
-        batchSize: 1, // Customize as needed
+        batchSize: 10,
+        maxBatchingWindow: Duration.seconds(5),
+        reportBatchItemFailures: true, // Only failed messages are retried
       })
     );
 
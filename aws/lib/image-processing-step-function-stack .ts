@@ -45,6 +45,13 @@ export class ImageProcessingStepFunctionStack extends cdk.Stack {
       }
     );
 
+    // Bucket with the original uploads, exported by ImageOptimizationStack
+    const originalImageBucket = s3.Bucket.fromBucketArn(
+      this,
+      "OriginalImageBucket",
+      cdk.Fn.importValue("OriginalImagesS3Bucket")
+    );
+
     // Segmentation Lambda Function (Docker-based)
     const segmentLambda = new lambda.DockerImageFunction(
       this,
@@ -53,89 +60,37 @@ export class ImageProcessingStepFunctionStack extends cdk.Stack {
         code: lambda.DockerImageCode.fromImageAsset(
           "lib/lambdas/ai-image-processing/segment"
         ),
-        memorySize: 1024,
-        architecture: lambda.Architecture.X86_64,
-        timeout: cdk.Duration.seconds(900),
-      }
-    );
-
-    // Classification Lambda Function (Docker-based)
-    const classifyLambda1 = new lambda.DockerImageFunction(
-      this,
-      "ClassifyLambda1",
-      {
-        code: lambda.DockerImageCode.fromImageAsset(
-          "lib/lambdas/ai-image-processing/classification"
-        ),
-        memorySize: 1024,
-        architecture: lambda.Architecture.X86_64,
-        timeout: cdk.Duration.seconds(900),
-        environment: {
-          MODEL_NAME: "models/classify1.pt",
-        },
-      }
-    );
-
-    const classifyLambda2 = new lambda.DockerImageFunction(
-      this,
-      "ClassifyLambda2",
-      {
-        code: lambda.DockerImageCode.fromImageAsset(
-          "lib/lambdas/ai-image-processing/classification"
-        ),
-        memorySize: 1024,
+        memorySize: 2048, // Room for a batch of SEGMENT_BATCH_SIZE images
         architecture: lambda.Architecture.X86_64,
         timeout: cdk.Duration.seconds(900),
         environment: {
-          MODEL_NAME: "models/classify2.pt",
+          // Read originals from S3 instead of going through the CDN
+          IMAGE_SOURCE: "s3",
+          ORIGINAL_IMAGE_BUCKET: originalImageBucket.bucketName,
+          INFERENCE_BATCH_SIZE: "4",
         },
       }
     );
 
-    const classifyLambda3 = new lambda.DockerImageFunction(
+    // Classification Lambda Function (Docker-based), runs every classification
+    // head over the same batch of crops
+    const classifyLambda = new lambda.DockerImageFunction(
       this,
-      "ClassifyLambda3",
+      "ClassifyLambda",
       {
         code: lambda.DockerImageCode.fromImageAsset(
           "lib/lambdas/ai-image-processing/classification"
         ),
-        memorySize: 1024,
+        memorySize: 2048,
         architecture: lambda.Architecture.X86_64,
         timeout: cdk.Duration.seconds(900),
         environment: {
-          MODEL_NAME: "models/classify3.pt",
-        },
-      }
-    );
-
-    const classifyLambda4 = new lambda.DockerImageFunction(
-      this,
-      "ClassifyLambda4",
-      {
-        code: lambda.DockerImageCode.fromImageAsset(
-          "lib/lambdas/ai-image-processing/classification"
-        ),
-        memorySize: 1024,
-        architecture: lambda.Architecture.X86_64,
-        timeout: cdk.Duration.seconds(900),
-        environment: {
-          MODEL_NAME: "models/classify4.pt",
-        },
-      }
-    );
-
-    const classifyLambda5 = new lambda.DockerImageFunction(
-      this,
-      "ClassifyLambda5",
-      {
-        code: lambda.DockerImageCode.fromImageAsset(
-          "lib/lambdas/ai-image-processing/classification"
-        ),
-        memorySize: 1024,
-        architecture: lambda.Architecture.X86_64,
-        timeout: cdk.Duration.seconds(900),
-        environment: {
-          MODEL_NAME: "models/classify5.pt",
+          MODEL_NAMES: [
+            "models/classify1.pt",
+            "models/classify2.pt",
+            "models/classify3.pt",
+            "models/classify5.pt",
+          ].join(","),
         },
       }
     );
@@ -148,24 +103,11 @@ export class ImageProcessingStepFunctionStack extends cdk.Stack {
     imageProcessingBucket.grantRead(segmentLambda); // Classification Lambda can read from S3
     imageProcessingTable.grantWriteData(segmentLambda); // Segmentation Lambda can write to DynamoDB
     imageProcessingTable.grantReadData(segmentLambda); // Classification Lambda can read from DynamoDB
+    originalImageBucket.grantRead(segmentLambda); // Segmentation Lambda reads the original uploads
 
-    imageProcessingTable.grantReadData(classifyLambda1);
-    imageProcessingTable.grantReadData(classifyLambda2);
-    imageProcessingTable.grantReadData(classifyLambda3);
-    imageProcessingTable.grantReadData(classifyLambda4);
-    imageProcessingTable.grantReadData(classifyLambda5);
-
-    imageProcessingBucket.grantRead(classifyLambda1);
-    imageProcessingBucket.grantRead(classifyLambda2);
-    imageProcessingBucket.grantRead(classifyLambda3);
-    imageProcessingBucket.grantRead(classifyLambda4);
-    imageProcessingBucket.grantRead(classifyLambda5);
-
-    imageProcessingBucket.grantPut(classifyLambda1);
-    imageProcessingBucket.grantPut(classifyLambda2);
-    imageProcessingBucket.grantPut(classifyLambda3);
-    imageProcessingBucket.grantPut(classifyLambda4);
-    imageProcessingBucket.grantPut(classifyLambda5);
+    imageProcessingTable.grantReadData(classifyLambda);
+    imageProcessingBucket.grantRead(classifyLambda);
+    imageProcessingBucket.grantPut(classifyLambda);
 
     // Step Function Tasks
     const segmentTask = new tasks.LambdaInvoke(this, "Segment Image", {
@@ -173,51 +115,11 @@ export class ImageProcessingStepFunctionStack extends cdk.Stack {
       outputPath: "$.Payload",
     });
 
-    const classifyTask1 = new tasks.LambdaInvoke(
+    const classifyTask = new tasks.LambdaInvoke(
       this,
-      "Classify Segmented Items 1",
+      "Classify Segmented Items",
       {
-        lambdaFunction: classifyLambda1,
-        inputPath: "$",
-        outputPath: "$.Payload",
-      }
-    );
-
-    const classifyTask2 = new tasks.LambdaInvoke(
-      this,
-      "Classify Segmented Items 2",
-      {
-        lambdaFunction: classifyLambda2,
-        inputPath: "$",
-        outputPath: "$.Payload",
-      }
-    );
-
-    const classifyTask3 = new tasks.LambdaInvoke(
-      this,
-      "Classify Segmented Items 3",
-      {
-        lambdaFunction: classifyLambda1,
-        inputPath: "$",
-        outputPath: "$.Payload",
-      }
-    );
-
-    const classifyTask4 = new tasks.LambdaInvoke(
-      this,
-      "Classify Segmented Items 4",
-      {
-        lambdaFunction: classifyLambda2,
-        inputPath: "$",
-        outputPath: "$.Payload",
-      }
-    );
-
-    const classifyTask5 = new tasks.LambdaInvoke(
-      this,
-      "Classify Segmented Items 5",
-      {
-        lambdaFunction: classifyLambda1,
+        lambdaFunction: classifyLambda,
         inputPath: "$",
         outputPath: "$.Payload",
       }
@@ -247,21 +149,18 @@ export class ImageProcessingStepFunctionStack extends cdk.Stack {
     });
 
     // Step Function Definition
-    const classificationParallel = new sfn.Parallel(
-      this,
-      "Run Multiple Classifications"
-    );
+    // Segmentation handles a batch of images; each segmented image is then
+    // classified and sent to SQS on its own
+    const classifyEachImage = new sfn.Map(this, "Classify Each Image", {
+      itemsPath: "$.results",
+      maxConcurrency: 4,
+    });
 
-    classificationParallel.branch(classifyTask1);
-    classificationParallel.branch(classifyTask2);
-    classificationParallel.branch(classifyTask3);
-    classificationParallel.branch(classifyTask4);
-    classificationParallel.branch(classifyTask5);
+    classifyEachImage.itemProcessor(
+      classifyTask.next(mergeResultsTask).next(sendToSqsTask)
+    );
 
-    segmentTask
-      .next(classificationParallel)
-      .next(mergeResultsTask)
-      .next(sendToSqsTask);
+    segmentTask.next(classifyEachImage);
 
     const workflow = new sfn.StateMachine(this, "ImageProcessingStateMachine", {
       definitionBody: sfn.DefinitionBody.fromChainable(segmentTask),
@@ -276,13 +175,18 @@ export class ImageProcessingStepFunctionStack extends cdk.Stack {
       timeout: cdk.Duration.seconds(30),
       environment: {
         STEP_FUNCTION_ARN: workflow.stateMachineArn,
+        SEGMENT_BATCH_SIZE: "8",
       },
     });
 
     // Grant necessary permissions
     imageProcessingQueue.grantConsumeMessages(sqsTriggerLambda);
     sqsTriggerLambda.addEventSource(
-      new event_sources.SqsEventSource(imageProcessingQueue)
+      // Collect uploads for a few seconds so they are segmented in batches
+      new event_sources.SqsEventSource(imageProcessingQueue, {
+        batchSize: 8,
+        maxBatchingWindow: cdk.Duration.seconds(5),
+      })
     );
 
     workflow.grantStartExecution(sqsTriggerLambda);
@@ -1,128 +1,151 @@
 import json
-from utils import create_response, handle_exception
-from sqlalchemy import select 
+from utils import handle_exception
+from sqlalchemy import select, insert, update
 from sqlalchemy_utils import session_handler
-from dripdrop_orm_objects import Image, ClothingItemTag, Tag, Coordinate, ClothingItem, Item,ClothingItemDetails
+from tag_cache import tag_cache, normalize_tag
+from recommendation_cache import invalidate_recommendations
+from dripdrop_orm_objects import Post, Image, ClothingItemTag, Coordinate, ClothingItem, Item, ClothingItemDetails
 
 def handler(event, context):
-    for record in event['Records']:
-        try:
-            print("Adding Classification Results to DB")
-            # Parse SQS record body
-            body = json.loads(record['body'])
+    records = event.get('Records', [])
+    print(f"Adding classification results to DB for {len(records)} messages")
+
+    try:
+        failed_message_ids = process_records(records)
+    except Exception as e:
+        # Nothing was committed, so let SQS redeliver the whole batch
+        print(f"Error processing batch: {e}")
+        failed_message_ids = [record['messageId'] for record in records]
 
-            image_path = body.get('image_path')
-            clothing_items = body.get('clothing_items', [])
+    # Only the failed messages return to the queue
+    return {
+        "batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed_message_ids]
+    }
 
-            if not image_path:
-                print("Not valid image_path")
-                raise Exception(f"Expected image_path, found: {image_path}")
 
-            print("Clothing items: ", clothing_items)
+def parse_record(record):
+    # Parse SQS record body
+    body = json.loads(record['body'])
 
-            items = []
-            seen_names = set()
-            for item in clothing_items:
-                item_name = item.get('item', 'unknown')
-                if item_name in seen_names:
-                    continue
-                seen_names.add(item_name)
+    image_path = body.get('image_path')
+    clothing_items = body.get('clothing_items', [])
 
-                coords = item.get('coordinates', {})
-                items.append({
-                    'name': item_name,
-                    'x_coordinate': (coords.get('xmin', 0) + coords.get('xmax', 0)) / 2,
-                    'y_coordinate': (coords.get('ymin', 0) + coords.get('ymax', 0)) / 2,
-                    'attributes': item.get('attributes', []),
-                    'color': item.get('color', {})
-                })
+    if not image_path:
+        print("Not valid image_path")
+        raise Exception(f"Expected image_path, found: {image_path}")
 
+    print("Clothing items: ", clothing_items)
 
+    items = []
+    seen_names = set()
+    for item in clothing_items:
+        item_name = item.get('item', 'unknown')
+        if item_name in seen_names:
+            continue
+        seen_names.add(item_name)
 
-            status_code, message = update_database(image_path, items)
+        coords = item.get('coordinates', {})
+        items.append({
+            'name': item_name,
+            'x_coordinate': (coords.get('xmin', 0) + coords.get('xmax', 0)) / 2,
+            'y_coordinate': (coords.get('ymin', 0) + coords.get('ymax', 0)) / 2,
+            'attributes': item.get('attributes', []),
+            'color': item.get('color', {})
+        })
+
+    return image_path, items
 
-            print(f"Processed image {image_path}: {status_code} - {message}")
 
+@session_handler
+def process_records(session, records):
+    """
+    Write a batch of messages in one transaction with a savepoint per message,
+    so a bad message is rolled back alone. Returns the IDs of failed messages.
+    """
+    failed_message_ids = []
+
+    parsed = []
+    for record in records:
+        try:
+            parsed.append((record['messageId'], *parse_record(record)))
         except Exception as e:
-            return create_response(500, f"Error updating user: {str(e)}")
+            print(f"Invalid message {record.get('messageId')}: {e}")
+            failed_message_ids.append(record['messageId'])
 
-    return {
-        "statusCode": 200,
-        "body": json.dumps("All messages processed.")
-    }
+    # Tags for the whole batch; known tags come from the container's cache
+    tag_ids = tag_cache.resolve(session, [tag for _, _, items in parsed for item in items for tag in item['attributes']])
+
+    added_item_types = set()
+    for message_id, image_path, items in parsed:
+        try:
+            with session.begin_nested():
+                status_code, message = update_database(session, image_path, items, tag_ids)
+            print(f"Processed image {image_path}: {status_code} - {message}")
+            if status_code == 200:
+                added_item_types.update(item['name'] for item in items)
+        except Exception as e:
+            print(f"Failed message {message_id} for image {image_path}: {e}")
+            failed_message_ids.append(message_id)
+            # In case a cached tag was deleted, reload the tags for the retry
+            tag_cache.invalidate()
+
+    # New items can outrank cached recommendations for items of the same type
+    invalidate_recommendations(session, added_item_types)
 
+    return failed_message_ids
 
-@session_handler   
-def update_database(session, image_path, items):
+
+def update_database(session, image_path, items, tag_ids):
     # Try to update the database
     try:
-        # Fetch post id for this image
-        # post = (session.execute(select(Post).join(Image).where(Image.imageID == image_id)).scalars().first())
-        # if not post:
-        #     return 404, f'Post with imageID: {image_id} does not exist'
         print("Updating database")
-        image =  session.execute(select(Image).where(Image.imageURL == image_path)).scalars().first()
+        image = session.execute(select(Image).where(Image.imageURL == image_path)).scalars().first()
 
-        # Get the Post associated with this image
-        post = image.postRel  # thanks to the relationship defined in ORM
+        if not image:
+            return 404, f'Image with imageID: {image_path} does not exist'
 
-        if post:
-            post.status = "NEEDS_REVIEW"
-            print(f"Updated post {post.postID} status to 'Needs Review'")
-        else:
-            print(f"No post found for image: {image.imageURL}")
+        # Flag the post of this image for review
+        session.execute(update(Post).where(Post.postID == image.postID).values(status="NEEDS_REVIEW"))
+        print(f"Updated post {image.postID} status to 'Needs Review'")
 
+        if not items:
+            return 200, f'No items to add for imageID: {image_path}'
 
-        if not image:
-            return 404, f'Image with imageID: {image_path} does not exist'
-        
-        # Loop over the items and update the database
-        for item in items:
-            item_name = item['name']
-            print("Item: ", item)
-            new_coordinates = Coordinate(
-                xCoord=item['x_coordinate'],
-                yCoord=item['y_coordinate']
-            )
-            session.add(new_coordinates)
-
-            new_clothing_item = ClothingItem()
-            session.add(new_clothing_item)
-            session.flush()  # required to get clothingItemID
-
-            #Add ClothingItemDetails with `name`
-            color = item.get('color', {})
-            new_details = ClothingItemDetails(
-                clothingItemID=new_clothing_item.clothingItemID,
-                name=item_name,
-                red=color.get('red'),
-                itemType=item_name,
-                green=color.get('green'),
-                blue=color.get('blue')
-            )
-            session.add(new_details)
-
-            session.add(new_details)
-
-            for tag in item['attributes']:
-                new_tag = get_or_create_tag(session, tag)
-
-                if new_tag is None:
-                    print(f"Skipping invalid tag: {tag}")
-                    continue
-                new_clothing_item_tag = ClothingItemTag(
-                    tagID=new_tag.tagID,
-                    clothingItemID=new_clothing_item.clothingItemID
-                )
-                session.add(new_clothing_item_tag)
-
-            new_item = Item(
-                imageID=image.imageID,
-                clothingItemID=new_clothing_item.clothingItemID,
-                coordinateID=new_coordinates.coordinateID
-            )
-            session.add(new_item)
+        # One flush for all generated keys. MySQL has no RETURNING, so this is
+        # still an INSERT per row, but nothing else is interleaved with them.
+        coordinates = [Coordinate(xCoord=item['x_coordinate'], yCoord=item['y_coordinate']) for item in items]
+        clothing_items = [ClothingItem() for _ in items]
+        session.add_all(coordinates + clothing_items)
+        session.flush()
 
+        details_rows, item_tag_rows, item_rows = [], [], []
+        for item, coordinate, clothing_item in zip(items, coordinates, clothing_items):
+            clothingItemID = clothing_item.clothingItemID
+            color = item.get('color', {})
+            details_rows.append({
+                'clothingItemID': clothingItemID,
+                'name': item['name'],
+                'itemType': item['name'],
+                'red': color.get('red'),
+                'green': color.get('green'),
+                'blue': color.get('blue'),
+            })
+
+            tags = [normalize_tag(tag) for tag in item['attributes'] if str(tag).strip()]
+            for tagID in dict.fromkeys(tag_ids[tag] for tag in tags):
+                item_tag_rows.append({'tagID': tagID, 'clothingItemID': clothingItemID})
+
+            item_rows.append({
+                'imageID': image.imageID,
+                'clothingItemID': clothingItemID,
+                'coordinateID': coordinate.coordinateID,
+            })
+
+        # Multi-row inserts for everything that needs no generated key
+        session.execute(insert(ClothingItemDetails), details_rows)
+        if item_tag_rows:
+            session.execute(insert(ClothingItemTag), item_tag_rows)
+        session.execute(insert(Item), item_rows)
 
         return 200, f'All tables populated successfully for imageID: {image_path}'
 
@@ -130,20 +153,3 @@ def update_database(session, image_path, items):
         # Call a helper to handle the exception
         code, msg = handle_exception(e, "Error occurred when updating database")
         raise Exception(e)
-
-
-def get_or_create_tag(session, tag_value):
-    tag_value = str(tag_value).lower()
-
-    existing_tag = session.execute(
-        select(Tag).where(Tag.tag == tag_value)
-    ).scalars().first()
-
-    if existing_tag:
-        return existing_tag
-
-    new_tag = Tag(tag=tag_value)
-    session.add(new_tag)
-    session.flush()
-
-    return new_tag
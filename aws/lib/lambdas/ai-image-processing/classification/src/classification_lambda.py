@@ -36,9 +36,14 @@ def handler(event, context):
             s3.get_object(Bucket=bucket_name, Key=s3_key)["Body"].read()
         )
 
+        # Cropped images are stored separately as raw bytes (older results inline them)
+        crops = None
+        if segmentation_result.get("crops_key"):
+            crops = s3.get_object(Bucket=bucket_name, Key=segmentation_result["crops_key"])["Body"].read()
+
         # Perform classification (dummy classification here)
         print("Classifying")
-        classified_output = classify_segment(segmentation_result)
+        classified_output = classify_segment(segmentation_result, crops)
         print("Done with  Classification")
 
         return {
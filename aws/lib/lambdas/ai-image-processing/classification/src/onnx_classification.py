@@ -0,0 +1,32 @@
+import numpy as np
+
+
+def create_session(model_path):
+    # Imported on first use, so util.py loads without onnxruntime when no model is configured
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+
+class OnnxClassificationModel:
+    """
+    YOLO classification head exported with export_onnx.py, run with ONNX
+    Runtime. The exported graph ends in the softmax, so it returns class
+    probabilities like result.probs of the Ultralytics model.
+    """
+
+    def __init__(self, model_path):
+        self.session = create_session(model_path)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        """(N, 3, H, W) float32 batch in 0-1 from util.preprocess_batch -> (N, classes) probabilities."""
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+def top5(probs):
+    """(indices, scores) of the five most likely classes of each row, most likely first."""
+    indices = np.argsort(-probs, axis=1, kind="stable")[:, :5]
+    return [(row.tolist(), scores[row].tolist()) for row, scores in zip(indices, probs)]
@@ -1,23 +1,38 @@
 import os
 import numpy as np
 import json, cv2, logging, time
-import torch
-from ultralytics import YOLO
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Constants
-MODEL_SIZE = (640, 640)
+MODEL_SIZE = (224, 224)  # Input size of the classification heads
 ATTRIBUTES_PATH = "attributes.json"
 BATCH_SIZE = 10  # Adjustable batch size
-
-# Load model based on environment variable
-model_name = os.getenv('MODEL_NAME')
-device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-logger.info(f"Loading model: {model_name} onto device: {device}")
-model = YOLO(model_name).to(device)
+MIN_ATTRIBUTE_SCORE = 0.2
+
+# "onnx" runs the .onnx export of each model (see export_onnx.py) with ONNX
+# Runtime instead of loading PyTorch and Ultralytics
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'ultralytics')
+
+# Comma separated list of classification heads, all run over the same batch.
+# MODEL_NAME is the single model setting from before.
+model_names = [name.strip() for name in os.getenv('MODEL_NAMES', os.getenv('MODEL_NAME', '')).split(',') if name.strip()]
+models = []
+if INFERENCE_BACKEND == 'onnx':
+    from onnx_classification import OnnxClassificationModel, top5
+    for model_name in model_names:
+        onnx_path = os.path.splitext(model_name)[0] + '.onnx'
+        logger.info(f"Loading ONNX model: {onnx_path}")
+        models.append(OnnxClassificationModel(onnx_path))
+else:
+    import torch
+    from ultralytics import YOLO
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    for model_name in model_names:
+        logger.info(f"Loading model: {model_name} onto device: {device}")
+        models.append(YOLO(model_name).to(device))
 
 # Load attribute map once
 with open(ATTRIBUTES_PATH, "r") as f:
@@ -26,36 +41,79 @@ with open(ATTRIBUTES_PATH, "r") as f:
 def map_to_clothing_label(class_id):
     return _ATTRIBUTE_MAP.get(class_id, str(class_id))
 
+def filter_top5(top5_indices, top5_scores):
+    # Filter based on confidence threshold
+    filtered_indices = []
+    filtered_scores = []
+    for idx, score in zip(top5_indices, top5_scores):
+        if score >= MIN_ATTRIBUTE_SCORE:
+            filtered_indices.append(idx)
+            filtered_scores.append(score)
+
+    return {'top5_indices': filtered_indices, 'top5_scores': filtered_scores}
+
 def output_fn(prediction_output):
     parsed = []
     for result in prediction_output:
         entry = {}
         if 'probs' in result._keys and result.probs is not None:
-            top5_indices = result.probs.top5
-            top5_scores = result.probs.top5conf.tolist()
-
-            # Filter based on confidence threshold
-            filtered_indices = []
-            filtered_scores = []
-            for idx, score in zip(top5_indices, top5_scores):
-                if score >= 0.2:
-                    filtered_indices.append(idx)
-                    filtered_scores.append(score)
-
-            entry['top5_indices'] = filtered_indices
-            entry['top5_scores'] = filtered_scores
+            entry = filter_top5(result.probs.top5, result.probs.top5conf.tolist())
 
         parsed.append(entry)
     return parsed
 
+def predict(model, batch):
+    """Filtered top 5 predictions of one head for a batch from preprocess_batch."""
+    if INFERENCE_BACKEND == 'onnx':
+        return [filter_top5(indices, scores) for indices, scores in top5(model(batch))]
+
+    with torch.no_grad():
+        return output_fn(model(torch.from_numpy(batch).to(device), verbose=False))
+
+
+def preprocess_batch(images):
+    """
+    BGR crops as one float32 array of shape (N, 3, H, W) scaled to 0-1, the
+    input YOLO classification heads take. Built once per batch and shared by
+    every head.
+
+    Channels stay in BGR order. The original code converted crops to RGB and
+    handed them to Ultralytics as numpy arrays, which it treats as BGR and
+    converts again, so the deployed heads have always been fed BGR. Switching
+    to RGB needs an accuracy check against labelled crops first.
+    """
+    batch = np.empty((len(images), MODEL_SIZE[1], MODEL_SIZE[0], 3), dtype=np.uint8)
+    for i, image in enumerate(images):
+        # Segmentation stores crops at MODEL_SIZE already; older results need a resize
+        if image.shape[:2] != (MODEL_SIZE[1], MODEL_SIZE[0]):
+            image = cv2.resize(image, MODEL_SIZE, interpolation=cv2.INTER_AREA)
+        batch[i] = image
+    return np.ascontiguousarray(batch.transpose(0, 3, 1, 2), dtype=np.float32) / 255
+
 
 def chunked(iterable, size):
     """Yield successive chunks of a given size."""
     for i in range(0, len(iterable), size):
         yield iterable[i:i + size]
 
-def classify_segment(segmented_items):
-    """Batch classify attributes of clothing items using YOLO in chunks."""
+def load_crop(item, crops):
+    """
+    The item's cropped image as a uint8 array. With the packed format it is a
+    read-only view into the crops buffer; results stored before that have
+    it inline as nested lists.
+    """
+    crop = item.pop("crop", None)
+    if crop is None:
+        return np.array(item["cropped_image"], dtype=np.uint8)
+
+    shape = tuple(crop["shape"])
+    return np.frombuffer(crops, dtype=np.uint8, count=int(np.prod(shape)), offset=crop["offset"]).reshape(shape)
+
+def classify_segment(segmented_items, crops=None):
+    """
+    Batch classify attributes of clothing items using YOLO in chunks.
+    crops is the raw buffer the items' "crop" offsets point into.
+    """
     items = segmented_items.get("clothing_items", [])
     if not items:
         return []
@@ -63,29 +121,27 @@ def classify_segment(segmented_items):
     results = []
 
     for batch_items in chunked(items, BATCH_SIZE):
-        batch_images = []
-
+        batch = preprocess_batch([load_crop(item, crops) for item in batch_items])
         for item in batch_items:
-            cropped_img_array = np.array(item["cropped_image"], dtype=np.uint8)
-            image_rgb = cv2.cvtColor(cropped_img_array, cv2.COLOR_BGR2RGB)
-            resized_image = cv2.resize(image_rgb, MODEL_SIZE)
-            batch_images.append(resized_image)
+            item["attributes"] = []
+            item.pop("cropped_image", None)
 
-        logger.info(f"Running batch of {len(batch_images)} items...")
+        logger.info(f"Running batch of {len(batch_items)} items through {len(models)} models...")
         start = time.time()
 
-        with torch.no_grad():
-            batch_result = model(batch_images)
+        for model in models:
+            predictions = predict(model, batch)
+
+            # Attributes from every head, in model order without duplicates
+            for item, pred in zip(batch_items, predictions):
+                for idx in pred.get("top5_indices", []):
+                    label = map_to_clothing_label(idx)
+                    if label not in item["attributes"]:
+                        item["attributes"].append(label)
 
         duration = time.time() - start
         logger.info(f"Batch inference time: {duration:.4f} seconds")
 
-        predictions = output_fn(batch_result)
-
-        for item, pred in zip(batch_items, predictions):
-            top5 = pred.get("top5_indices", [])
-            item["attributes"] = [map_to_clothing_label(idx) for idx in top5]
-            item.pop("cropped_image", None)
-            results.append(item)
+        results.extend(batch_items)
 
     return results
@@ -0,0 +1,46 @@
+"""
+Export the segmentation and classification models to ONNX for
+INFERENCE_BACKEND=onnx. Each .onnx file is written next to its .pt file, so
+it is copied into the Lambda images with the rest of src/.
+
+    python lib/lambdas/ai-image-processing/export_onnx.py
+    python lib/lambdas/ai-image-processing/export_onnx.py --opset 17
+
+Needs ultralytics and onnx installed locally.
+"""
+
+import argparse
+from pathlib import Path
+from ultralytics import YOLO
+
+AI_DIR = Path(__file__).resolve().parent
+SEGMENTATION_MODEL = AI_DIR / "segment" / "src" / "segmentation-model.pt"
+CLASSIFICATION_MODELS = sorted((AI_DIR / "classification" / "src" / "models").glob("*.pt"))
+
+# The segmentation Lambda resizes images to 640x640, the classification
+# Lambda crops to 224x224; both run batches, so batch size stays dynamic
+SEGMENTATION_SIZE = 640
+CLASSIFICATION_SIZE = 224
+
+
+def export(model_path, imgsz, dynamic, opset):
+    exported = YOLO(str(model_path)).export(format="onnx", imgsz=imgsz, dynamic=dynamic, opset=opset, simplify=True)
+    print(f"{model_path.name} -> {exported}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--opset", type=int, default=None, help="ONNX opset, Ultralytics' default if not given")
+    args = parser.parse_args()
+
+    if SEGMENTATION_MODEL.exists():
+        export(SEGMENTATION_MODEL, SEGMENTATION_SIZE, dynamic=True, opset=args.opset)
+    else:
+        print(f"Skipping {SEGMENTATION_MODEL}, not found")
+
+    for model_path in CLASSIFICATION_MODELS:
+        export(model_path, CLASSIFICATION_SIZE, dynamic=True, opset=args.opset)
+
+
+if __name__ == "__main__":
+    main()
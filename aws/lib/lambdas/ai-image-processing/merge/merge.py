@@ -11,7 +11,10 @@ def handler(event, context):
 
     merged_items = {}
 
-    for entry in event:
+    # A single classification task passes its result directly, parallel ones a list
+    entries = event if isinstance(event, list) else [event]
+
+    for entry in entries:
         body = json.loads(entry.get("body", "{}"))
 
         if not combined["image_id"]:
@@ -0,0 +1,132 @@
+import numpy as np
+import cv2
+import onnxruntime as ort
+
+# Ultralytics predict() defaults, so both backends keep the same detections
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+MAX_NMS_CANDIDATES = 30000
+
+# Boxes are shifted by class * this before NMS so classes never suppress each other
+CLASS_OFFSET = 7680
+
+
+def create_session(model_path):
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+
+
+def nms(boxes, scores, iou_threshold):
+    """Indices of the boxes kept by greedy non-maximum suppression, highest score first."""
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        width = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        height = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        intersection = width * height
+        iou = intersection / (areas[i] + areas[rest] - intersection + 1e-7)
+
+        order = rest[iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
+
+
+class OnnxSegmentationModel:
+    """
+    YOLO segmentation model exported with export_onnx.py, run with ONNX Runtime.
+    Takes BGR images already resized to the model input size and returns
+    the same {"boxes", "masks"} detections per image as util.output_fn does
+    for the Ultralytics model.
+    """
+
+    def __init__(self, model_path):
+        self.session = create_session(model_path)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, images):
+        """Detections for each image, run as one batch."""
+        batch = np.concatenate([self.preprocess(image) for image in images])
+        predictions, protos = self.session.run(None, {self.input_name: batch})
+        return [
+            self.postprocess(prediction, proto, image.shape[:2])
+            for prediction, proto, image in zip(predictions, protos, images)
+        ]
+
+    @staticmethod
+    def preprocess(image):
+        """BGR HWC uint8 -> RGB NCHW float32 in 0-1."""
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        return np.ascontiguousarray(rgb.transpose(2, 0, 1)[None], dtype=np.float32) / 255
+
+    @staticmethod
+    def postprocess(predictions, protos, shape):
+        """
+        predictions: (4 + classes + mask coefficients, anchors) for one image,
+        protos: (mask coefficients, mask height, mask width).
+        """
+        num_coefficients = protos.shape[0]
+        predictions = predictions.T
+        num_classes = predictions.shape[1] - 4 - num_coefficients
+
+        class_scores = predictions[:, 4:4 + num_classes]
+        class_ids = class_scores.argmax(axis=1)
+        confidences = class_scores[np.arange(len(class_ids)), class_ids]
+
+        candidates = confidences > CONF_THRESHOLD
+        predictions, class_ids, confidences = predictions[candidates], class_ids[candidates], confidences[candidates]
+
+        order = confidences.argsort()[::-1][:MAX_NMS_CANDIDATES]
+        predictions, class_ids, confidences = predictions[order], class_ids[order], confidences[order]
+
+        # Center x, y, width, height -> corners
+        xy, wh = predictions[:, :2], predictions[:, 2:4]
+        boxes = np.concatenate([xy - wh / 2, xy + wh / 2], axis=1)
+
+        keep = nms(boxes + class_ids[:, None] * CLASS_OFFSET, confidences, IOU_THRESHOLD)[:MAX_DETECTIONS]
+        boxes, class_ids, confidences = boxes[keep], class_ids[keep], confidences[keep]
+        coefficients = predictions[keep, 4 + num_classes:]
+
+        masks = process_masks(protos, coefficients, boxes, shape)
+
+        height, width = shape
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+
+        return {
+            "boxes": np.column_stack([boxes, confidences, class_ids]).tolist(),
+            "masks": masks,
+        }
+
+
+def process_masks(protos, coefficients, boxes, shape):
+    """
+    Binary masks at the input resolution, as Ultralytics' process_mask: mask
+    logits cropped to each box at prototype resolution, upsampled
+    bilinearly and thresholded at 0.
+    """
+    num_coefficients, mask_height, mask_width = protos.shape
+    height, width = shape
+    if not len(boxes):
+        return np.zeros((0, height, width), dtype=bool)
+
+    logits = (coefficients @ protos.reshape(num_coefficients, -1)).reshape(-1, mask_height, mask_width)
+
+    scaled = boxes * np.array([mask_width / width, mask_height / height] * 2, dtype=boxes.dtype)
+    columns = np.arange(mask_width)[None, None, :]
+    rows = np.arange(mask_height)[None, :, None]
+    x1, y1, x2, y2 = (scaled[:, i, None, None] for i in range(4))
+    logits *= (columns >= x1) & (columns < x2) & (rows >= y1) & (rows < y2)
+
+    masks = np.empty((len(logits), height, width), dtype=bool)
+    for i, mask_logits in enumerate(logits):
+        masks[i] = cv2.resize(mask_logits, (width, height), interpolation=cv2.INTER_LINEAR) > 0
+    return masks
@@ -1,7 +1,7 @@
 import json
 import boto3
 import uuid
-from util import segment_image
+from util import segment_images, pack_crops
 
 s3 = boto3.client("s3")
 dynamodb = boto3.resource("dynamodb")
@@ -10,42 +10,76 @@ table = dynamodb.Table("ImageProcessingTable")
 BUCKET_NAME = "ai-image-processing-results"
 
 def handler(event, context):
+    """
+    AWS Lambda handler for segmentation. Takes "image_paths" to segment a batch
+    of images with one inference call, or a single "image_path". Returns the
+    stored result of each image under "results" and the images that could not
+    be segmented under "failed".
+    """
     print("Running Handler")
-    """AWS Lambda handler for segmentation."""
     try:
-        image_path = event.get("image_path")
-        if not image_path:
-            return {"statusCode": 400, "body": json.dumps({"error": "Missing 'image_path'"})}
-
-        # Generate unique image ID
-        image_id = str(uuid.uuid4())
+        image_paths = event.get("image_paths") or ([event["image_path"]] if event.get("image_path") else [])
+        if not image_paths:
+            return {"statusCode": 400, "body": json.dumps({"error": "Missing 'image_path' or 'image_paths'"})}
 
         # Perform segmentation
-        segmentation_output = segment_image(image_path)
-
-        # Save segmentation output to S3
-        s3_key = f"segmentation_results/{image_id}.json"
-        s3.put_object(
-            Bucket=BUCKET_NAME,
-            Key=s3_key,
-            Body=json.dumps(segmentation_output),
-            ContentType="application/json"
-        )
-
-        s3_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
-
-        # Store metadata in DynamoDB
-        table.put_item(Item={
-            "image_id": image_id,
-            "image_path": image_path,
-            "segmentation_s3_url": s3_url
-        })
-
-        return {
-            "statusCode": 200,
-            "body": json.dumps({"image_id": image_id, "segmentation_s3_url": s3_url})
-        }
+        segmentation_outputs = segment_images(image_paths)
+
+        results = []
+        failed = []
+        for image_path, segmentation_output in zip(image_paths, segmentation_outputs):
+            if "error" in segmentation_output:
+                print(f"Segmentation failed for {image_path}: {segmentation_output['error']}")
+                failed.append({"image_path": image_path, "error": segmentation_output["error"]})
+                continue
+
+            try:
+                results.append(store_segmentation(image_path, segmentation_output))
+            except Exception as e:
+                print(f"Error storing segmentation of {image_path}: {e}")
+                failed.append({"image_path": image_path, "error": "Failed to store segmentation"})
+
+        return {"statusCode": 200, "results": results, "failed": failed}
 
     except Exception as e:
         print(f"Error in segmentation: {e}")
         return {"statusCode": 500, "body": json.dumps({"error": "Segmentation failed"})}
+
+
+def store_segmentation(image_path, segmentation_output):
+    """Save one image's segmentation to S3 and DynamoDB, returning the classification input."""
+    # Generate unique image ID
+    image_id = str(uuid.uuid4())
+
+    # Crops go to S3 as raw bytes next to the JSON, which references them by key
+    crops_key = f"segmentation_results/{image_id}.crops"
+    s3.put_object(
+        Bucket=BUCKET_NAME,
+        Key=crops_key,
+        Body=pack_crops(segmentation_output),
+        ContentType="application/octet-stream"
+    )
+    segmentation_output["crops_key"] = crops_key
+
+    # Save segmentation output to S3
+    s3_key = f"segmentation_results/{image_id}.json"
+    s3.put_object(
+        Bucket=BUCKET_NAME,
+        Key=s3_key,
+        Body=json.dumps(segmentation_output),
+        ContentType="application/json"
+    )
+
+    s3_url = f"https://{BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
+
+    # Store metadata in DynamoDB
+    table.put_item(Item={
+        "image_id": image_id,
+        "image_path": image_path,
+        "segmentation_s3_url": s3_url
+    })
+
+    return {
+        "statusCode": 200,
+        "body": json.dumps({"image_id": image_id, "segmentation_s3_url": s3_url})
+    }
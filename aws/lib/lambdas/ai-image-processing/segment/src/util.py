@@ -1,20 +1,43 @@
+import os
 import numpy as np
 import time, json, cv2
-import logging, requests
-import torch
-from sklearn.cluster import KMeans
-from ultralytics import YOLO
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from color import dominant_color as detect_dominant_color
+from image_source import load_image
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+# "onnx" runs segmentation-model.onnx (see export_onnx.py) with ONNX Runtime
+# instead of loading PyTorch and Ultralytics
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "ultralytics")
 
 # Load model once at import time
-model = YOLO("segmentation-model.pt").to(device)
+if INFERENCE_BACKEND == "onnx":
+    from onnx_segmentation import OnnxSegmentationModel
+    model = OnnxSegmentationModel("segmentation-model.onnx")
+else:
+    import torch
+    from ultralytics import YOLO
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = YOLO("segmentation-model.pt").to(device)
 MODEL_SIZE = (640, 640)
 
+# Letterbox padding, the gray Ultralytics pads with
+PAD_COLOR = (114, 114, 114)
+
+# Input size of the classification heads; crops are stored at this size so
+# classification doesn't resize them again
+CLASSIFIER_SIZE = (224, 224)
+
+# Parallel downloads when segmenting several images
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", 8))
+
+# Images per inference call; the rest of the batch keeps downloading meanwhile
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", 4))
+
 # Load category map at import time
 with open("categories.json", "r") as f:
     _CATEGORY_MAP = {item["id"]: item["name"] for item in json.load(f)["categories"]}
@@ -24,39 +47,6 @@ def map_to_category_label(id):
     return _CATEGORY_MAP.get(id, None)
 
 
-def detect_dominant_color(image, mask=None, k=3):
-    if mask is not None:
-        # Apply the mask to extract relevant pixels
-        masked_pixels = image[mask.astype(bool)]
-    else:
-        masked_pixels = image.reshape((-1, 3))
-
-    if masked_pixels.size == 0:
-        return {"red": 0, "green": 0, "blue": 0, "error": "Empty masked image"}
-
-    pixels = np.float32(masked_pixels)
-
-    try:
-        kmeans = KMeans(n_clusters=k, n_init=10)
-        kmeans.fit(pixels)
-        _, counts = np.unique(kmeans.labels_, return_counts=True)
-        dominant = kmeans.cluster_centers_[np.argmax(counts)]
-        return {
-            "red": int(dominant[2]),
-            "green": int(dominant[1]),
-            "blue": int(dominant[0])
-        }
-    except Exception as e:
-        return {"red": 0, "green": 0, "blue": 0, "error": str(e)}
-
-
-def get_image(image_path):
-    url = f"https://cdn.dripdropco.com/{image_path}?format=jpeg"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.content
-
-
 def output_fn(prediction_output):
     print("Executing output_fn from inference...")
     infer = {}
@@ -70,9 +60,8 @@ def output_fn(prediction_output):
             infer["boxes"] = boxes_tensor.cpu().numpy().tolist()
 
         if "masks" in result._keys and result.masks is not None:
-            # Extract tensor from Masks object
-            masks_tensor = result.masks.data  # This is a tensor
-            infer["masks"] = masks_tensor.cpu().numpy().tolist()
+            # Threshold on the tensor and keep the (N, H, W) masks as a bool array
+            infer["masks"] = (result.masks.data > 0.5).cpu().numpy()
 
         if "keypoints" in result._keys and result.keypoints is not None:
             infer["keypoints"] = result.keypoints.cpu().numpy().tolist()
@@ -85,38 +74,115 @@ def output_fn(prediction_output):
 
     return infer
 
-def segment_image(image_path):
-    infer_start_time = time.time()
-    logger.info("Fetching image")
-    image = get_image(image_path)
-    logger.info("Image fetched")
-
-    # Decode to OpenCV image
-    image_array = np.frombuffer(image, dtype=np.uint8)
-    orig_image = cv2.imdecode(image_array, flags=-1)
-    if orig_image is None:
-        logger.error("Failed to decode image.")
-        return {"error": "Invalid image data"}
 
-    resized_image = cv2.resize(orig_image, MODEL_SIZE)
+def run_inference(images):
+    """Boxes and masks for each image of MODEL_SIZE, run as one batch with the configured backend."""
+    if INFERENCE_BACKEND == "onnx":
+        return model(images)
 
     with torch.no_grad():
-        logger.info("Running inference")
-        result = model(resized_image)
+        return [output_fn([result]) for result in model(images)]
+
+
+def letterbox(image, size=MODEL_SIZE):
+    """
+    Resize keeping the aspect ratio and pad to size, as Ultralytics' LetterBox.
+    Returns (letterboxed image, scale, (pad_x, pad_y)); a point maps back to
+    the original image as (point - pad) / scale.
+    """
+    height, width = image.shape[:2]
+    scale = min(size[0] / width, size[1] / height)
+    new_width, new_height = round(width * scale), round(height * scale)
+
+    pad_x, pad_y = (size[0] - new_width) / 2, (size[1] - new_height) / 2
+    top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+    left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=PAD_COLOR)
+    return image, scale, (left, top)
+
+
+def segment_images(image_paths):
+    """
+    Segment several images, INFERENCE_BATCH_SIZE at a time. All downloads start
+    at once, so later images are fetched while earlier ones are in inference.
+    Returns one output per path, in order: the segment_image result, or
+    {"error": ...} if the image couldn't be loaded.
+    """
+    outputs = [None] * len(image_paths)
+
+    with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(image_paths))) as pool:
+        futures = [pool.submit(load_image, image_path) for image_path in image_paths]
+
+        for start in range(0, len(image_paths), INFERENCE_BATCH_SIZE):
+            fetch_start_time = time.time()
+            orig_images = {}
+            for i in range(start, min(start + INFERENCE_BATCH_SIZE, len(image_paths))):
+                try:
+                    orig_image = futures[i].result()
+                except Exception as e:
+                    logger.error(f"Failed to fetch {image_paths[i]}: {e}")
+                    outputs[i] = {"error": "Failed to fetch image"}
+                    continue
+
+                if orig_image is None:
+                    logger.error(f"Failed to decode {image_paths[i]}.")
+                    outputs[i] = {"error": "Invalid image data"}
+                    continue
+
+                orig_images[i] = orig_image
+
+            logger.info(f"Waited {time.time() - fetch_start_time:0.4f} seconds for {len(orig_images)} images")
+            if not orig_images:
+                continue
 
-    detection_results = output_fn(result)
-    infer_end_time = time.time()
-    logger.info(f"Inference Time = {infer_end_time - infer_start_time:0.4f} seconds")
+            letterboxed = [letterbox(orig_image) for orig_image in orig_images.values()]
 
-    boxes = detection_results.get("boxes", [])
+            infer_start_time = time.time()
+            logger.info(f"Running inference on {len(letterboxed)} images")
+            detections = run_inference([image for image, _, _ in letterboxed])
+            logger.info(f"Inference Time = {time.time() - infer_start_time:0.4f} seconds")
+
+            for (i, orig_image), (_, scale, pad), detection_results in zip(orig_images.items(), letterboxed, detections):
+                outputs[i] = extract_items(orig_image, scale, pad, detection_results)
+
+    return outputs
+
+
+def segment_image(image_path):
+    return segment_images([image_path])[0]
+
+
+def extract_items(orig_image, scale, pad, detection_results):
+    """
+    Clothing items, with their crop and dominant color, from one image's
+    detections. Boxes and masks are in the letterboxed model input (see
+    letterbox); crops, colors and coordinates come from the original image.
+    """
+    boxes = np.asarray(detection_results.get("boxes", []), dtype=np.float32).reshape(-1, 6)
     masks = detection_results.get("masks", None)
     items = []
 
+    # Threshold every mask in one operation; each item then takes its box
+    if masks is not None:
+        masks = np.asarray(masks)
+        if masks.dtype != bool:
+            masks = masks > 0.5
+
+    # Every box back to original pixels at once
+    orig_h, orig_w = orig_image.shape[:2]
+    pad_x, pad_y = pad
+    orig_boxes = (boxes[:, :4] - (pad_x, pad_y, pad_x, pad_y)) / scale
+    orig_boxes[:, [0, 2]] = orig_boxes[:, [0, 2]].clip(0, orig_w)
+    orig_boxes[:, [1, 3]] = orig_boxes[:, [1, 3]].clip(0, orig_h)
+
     for i, box in enumerate(boxes):
         try:
             mask_binary = None
-            xmin, ymin, xmax, ymax = map(int, box[:4])
-            conf = round(box[4], 2)
+            xmin, ymin, xmax, ymax = map(int, orig_boxes[i])
+            conf = round(float(box[4]), 2)
             cls_id = int(box[5])
 
             if map_to_category_label(cls_id) is None:
@@ -137,44 +203,38 @@ def segment_image(image_path):
                 logger.warning("Empty crop encountered, skipping.")
                 continue
 
-
-
             # Segmentation mask logic
             if masks is not None and i < len(masks):
-                mask = np.array(masks[i])
-                mask_resized = cv2.resize(mask, (xmax - xmin, ymax - ymin))
-
-                if mask_resized.size == 0:
-                    logger.warning("Empty mask encountered, skipping mask.")
-                else:
-                    _, mask_binary = cv2.threshold(mask_resized, 0.5, 1, cv2.THRESH_BINARY)
-                    if mask_binary.shape[:2] != cropped_img.shape[:2]:
-                        mask_binary = cv2.resize(mask_binary, (cropped_img.shape[1], cropped_img.shape[0]))
-                    try:
-                        cropped_img = cv2.bitwise_and(
-                            cropped_img, cropped_img, mask=mask_binary.astype(np.uint8)
-                        )
-                    except cv2.error as e:
-                        logger.error(f"OpenCV error applying mask: {e}")
-                        continue
+                # The crop's area in the letterboxed mask, scaled up to the crop once
+                mask_x0, mask_y0 = int(xmin * scale + pad_x), int(ymin * scale + pad_y)
+                mask_x1 = max(int(np.ceil(xmax * scale + pad_x)), mask_x0 + 1)
+                mask_y1 = max(int(np.ceil(ymax * scale + pad_y)), mask_y0 + 1)
+                mask_binary = cv2.resize(
+                    masks[i, mask_y0:mask_y1, mask_x0:mask_x1].astype(np.uint8),
+                    (cropped_img.shape[1], cropped_img.shape[0]),
+                    interpolation=cv2.INTER_NEAREST,
+                ).astype(bool)
+
+                # Zero the pixels outside the mask (a new array, orig_image is untouched)
+                cropped_img = cropped_img * mask_binary[..., None]
 
             if np.count_nonzero(mask_binary) < 10:
                 dominant_color = detect_dominant_color(cropped_img)  # fallback: no mask
             else:
                 dominant_color = detect_dominant_color(cropped_img, mask_binary)
 
-            resized_h, resized_w = resized_image.shape[:2]
             item = {
                 "item": map_to_category_label(cls_id),
                 "confidence": conf,
                 "color": dominant_color,
                 "coordinates": {
-                    "xmin": xmin / resized_w,
-                    "ymin": ymin / resized_h,
-                    "xmax": xmax / resized_w,
-                    "ymax": ymax / resized_h,
+                    "xmin": xmin / orig_w,
+                    "ymin": ymin / orig_h,
+                    "xmax": xmax / orig_w,
+                    "ymax": ymax / orig_h,
                 },
-                "cropped_image": cropped_img.tolist(),
+                # Packed into a binary blob by pack_crops before the output is stored
+                "cropped_image": cv2.resize(cropped_img, CLASSIFIER_SIZE, interpolation=cv2.INTER_AREA),
             }
             items.append(item)
 
@@ -183,3 +243,17 @@ def segment_image(image_path):
 
 
     return {"clothing_items": items}
+
+
+def pack_crops(segmentation_output):
+    """
+    Move each item's cropped image into one raw uint8 buffer. The item keeps
+    {"offset", "shape"} under "crop" so classification can view it again
+    with np.frombuffer instead of parsing nested JSON lists.
+    """
+    buffer = bytearray()
+    for item in segmentation_output.get("clothing_items", []):
+        crop = np.ascontiguousarray(item.pop("cropped_image"), dtype=np.uint8)
+        item["crop"] = {"offset": len(buffer), "shape": list(crop.shape)}
+        buffer += crop.tobytes()
+    return bytes(buffer)
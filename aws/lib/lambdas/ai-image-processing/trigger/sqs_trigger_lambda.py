@@ -11,12 +11,15 @@ logger = logging.getLogger(__name__)
 sfn_client = boto3.client("stepfunctions")
 STATE_MACHINE_ARN = os.getenv("STEP_FUNCTION_ARN")
 
-def start_step_function(image_path):
-    """Starts execution of the Step Function with the given image path."""
+# Images segmented together in one execution
+SEGMENT_BATCH_SIZE = int(os.getenv("SEGMENT_BATCH_SIZE", 8))
+
+def start_step_function(image_paths):
+    """Starts execution of the Step Function with the given image paths."""
     try:
         response = sfn_client.start_execution(
             stateMachineArn=STATE_MACHINE_ARN,
-            input=json.dumps({"image_path": image_path})
+            input=json.dumps({"image_paths": image_paths})
         )
         execution_arn = response.get("executionArn")
         logger.info(f"Started Step Function Execution: {execution_arn}")
@@ -32,7 +35,7 @@ def handler(event, context):
             logger.warning("No records found in event.")
             return {"statusCode": 400, "body": json.dumps({"error": "No records in event"})}
 
-        execution_arns = []
+        image_paths = []
         for record in event["Records"]:
             try:
                 message_body = json.loads(record["body"])
@@ -42,14 +45,21 @@ def handler(event, context):
                     logger.warning(f"Missing 'image_path' in message: {message_body}")
                     continue
 
-                execution_arn = start_step_function(image_path)
-                execution_arns.append(execution_arn)
+                image_paths.append(image_path)
 
             except json.JSONDecodeError as json_err:
                 logger.error(f"JSON parsing error: {json_err}")
             except Exception as process_err:
                 logger.error(f"Error processing record: {process_err}")
 
+        # One execution per batch, so segmentation runs the images through the model together
+        execution_arns = []
+        for i in range(0, len(image_paths), SEGMENT_BATCH_SIZE):
+            try:
+                execution_arns.append(start_step_function(image_paths[i:i + SEGMENT_BATCH_SIZE]))
+            except Exception as process_err:
+                logger.error(f"Error starting execution: {process_err}")
+
         return {
             "statusCode": 200,
             "body": json.dumps({"message": "Step Function started", "executions": execution_arns}),
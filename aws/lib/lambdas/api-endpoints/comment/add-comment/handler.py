@@ -3,6 +3,7 @@ from datetime import date
 from utils import create_response, handle_exception
 from sqlalchemy import select
 from sqlalchemy_utils import session_handler, get_user_by_email
+from post_utils import update_post_counter
 from dripdrop_orm_objects import Comment, User, Post
 
 def handler(event, context):
@@ -43,6 +44,7 @@ def createComment(session, email, postId, content):
         )
 
         session.add(new_comment)
+        update_post_counter(session, postId, "commentCount", 1)
         return 201, f"User {user.uuid} commented on post {postId}"
 
     except Exception as e:
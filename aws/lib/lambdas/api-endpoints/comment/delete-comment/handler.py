@@ -1,6 +1,7 @@
 from utils import create_response, handle_exception
 from sqlalchemy import select
 from sqlalchemy_utils import session_handler
+from post_utils import update_post_counter
 from dripdrop_orm_objects import Comment
 
 def handler(event, context):    
@@ -33,6 +34,7 @@ def deleteComment(session, commentId):
             return 404, "Comment was not found."
 
         session.delete(comment)
+        update_post_counter(session, comment.postID, "commentCount", -1)
         return 200, "Comment was deleted successfully."
 
     except Exception as e:
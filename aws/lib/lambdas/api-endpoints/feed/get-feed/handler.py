@@ -1,10 +1,17 @@
 import json
+import base64
 from utils import create_response, handle_exception
-from sqlalchemy import select
+from sqlalchemy import select, or_, and_
 from sqlalchemy.orm import aliased
 from sqlalchemy_utils import session_handler, get_user_by_email
-from dripdrop_orm_objects import Post, HasSeen, User
-from datetime import datetime, date
+from post_utils import serialize_posts
+from feed_utils import get_fanout_on_read_authors
+from dripdrop_orm_objects import Post, HasSeen, Follow, FeedInbox
+from datetime import date
+
+# Feed phases, in the order they are served
+FOLLOWED = "followed"
+OTHER = "other"
 
 def handler(event, context):
     try:
@@ -14,7 +21,11 @@ def handler(event, context):
 
         limit = int(query_params.get('limit', 20))
 
-        status_code, message = getFeed(email, limit)
+        # Passing a cursor (empty for the first page) opts in to paginated responses
+        paginate = 'cursor' in query_params
+        cursor = query_params.get('cursor') or None
+
+        status_code, message = getFeed(email, limit, cursor, paginate)
         return create_response(status_code, message)
 
     except Exception as e:
@@ -23,103 +34,146 @@ def handler(event, context):
 
 
 @session_handler
-def getFeed(session, email, limit: int = 20):
+def getFeed(session, email, limit: int = 20, cursor=None, paginate=False):
     try:
         user = get_user_by_email(session, email)
         userID = user.userID
-        status, followed_users = getFollowing(session, userID)
-        if status != 200:
-            return 500, "Error retrieving followed users"
-        
-        followed_user_ids = {user["userID"] for user in followed_users}
+        followed_user_ids = getFollowedUserIds(session, userID)
+
+        phase, after = decodeCursor(cursor)
+
+        # Each page resumes where the previous one ended: (createdDate, postID) descending
+        followed_posts = []
+        if phase == FOLLOWED:
+            followed_posts = getFollowedPosts(session, userID, followed_user_ids, limit, after)
+            after = None
 
-        followed_posts = getFollowedPosts(session, userID, followed_user_ids, limit)
+        page = [(FOLLOWED, row) for row in followed_posts]
+        exhausted = False
 
-        if len(followed_posts) >= limit:
-            posts_to_return = followed_posts
-        else:
+        if len(followed_posts) < limit:
             remaining_limit = limit - len(followed_posts)
-            non_followed_posts = getNonFollowedPosts(session, userID, followed_user_ids, remaining_limit)
-            posts_to_return = followed_posts + non_followed_posts
-
-        feed_posts_serialized = [
-            {
-                "postID": post.postID,
-                "uuid": post.userRel.uuid if post.userRel else None,
-                "username": post.userRel.username,
-                "caption": post.caption,
-                "createdDate": (
-                    post.createdDate.isoformat()
-                    if isinstance(post.createdDate, (datetime, date))
-                    else str(post.createdDate)
-                ),
-                "images": [
-                    {"imageID": image.imageID, "imageURL": image.imageURL}
-                    for image in post.images
-                ],
-                "numLikes": len(post.likes),
-                "numComments": len(post.comments),
-                "user": (
-                    {
-                        "username": post.userRel.username,
-                        "profilePic": post.userRel.profilePicURL
-                    }
-                ),
-                "userHasLiked": int(userID) in {like.userID for like in post.likes},
-                "userHasSaved": int(userID) in {bookmark.userID for bookmark in post.bookmarks},
-            }
-            for post in posts_to_return
-        ]
-
-        return 200, feed_posts_serialized
+            non_followed_posts = getNonFollowedPosts(session, userID, followed_user_ids, remaining_limit, after)
+            page += [(OTHER, row) for row in non_followed_posts]
+            exhausted = len(non_followed_posts) < remaining_limit
+
+        feed_posts_serialized = serialize_posts(session, [row.postID for _, row in page], userID)
+
+        if not paginate:
+            return 200, feed_posts_serialized
+
+        next_cursor = None
+        if page and not exhausted:
+            last_phase, last_row = page[-1]
+            next_cursor = encodeCursor(last_phase, last_row.createdDate, last_row.postID)
+
+        return 200, {"posts": feed_posts_serialized, "nextCursor": next_cursor}
 
     except Exception as e:
         return handle_exception(e, "getFeed")
 
 
-def getFollowedPosts(session, userID: int, followed_user_ids, limit):
-    seen_alias = aliased(HasSeen)
+def encodeCursor(phase, created_date, post_id):
+    payload = json.dumps({
+        "phase": phase,
+        "createdDate": created_date.isoformat() if created_date else None,
+        "postID": post_id,
+    })
+    return base64.urlsafe_b64encode(payload.encode()).decode()
 
-    return session.query(Post).filter(
-        Post.userID.in_(followed_user_ids),
-        Post.userID != userID,
-        Post.status.ilike("public"),
-        ~session.query(seen_alias).filter(
-            seen_alias.postID == Post.postID,
-            seen_alias.userID == userID
-        ).exists()
-    ).order_by(Post.createdDate.desc()).limit(limit).all()
 
+def decodeCursor(cursor):
+    # No cursor means the first page of the followed phase
+    if not cursor:
+        return FOLLOWED, None
 
-def getNonFollowedPosts(session, userID: int, followed_user_ids, limit):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        phase = payload["phase"]
+        if phase not in (FOLLOWED, OTHER):
+            raise ValueError(phase)
+        created_date = date.fromisoformat(payload["createdDate"]) if payload["createdDate"] else None
+        return phase, (created_date, int(payload["postID"]))
+    except Exception:
+        raise Exception("400", "Invalid feed cursor")
+
+
+def afterCursor(after, date_column=Post.createdDate, id_column=Post.postID):
+    created_date, post_id = after
+    if created_date is None:
+        return and_(date_column.is_(None), id_column < post_id)
+    return or_(
+        date_column < created_date,
+        and_(date_column == created_date, id_column < post_id),
+        date_column.is_(None),
+    )
+
+
+def notSeen(userID, post_id_column):
     seen_alias = aliased(HasSeen)
+    return ~select(seen_alias).filter(
+        seen_alias.postID == post_id_column,
+        seen_alias.userID == userID
+    ).exists()
+
 
-    return session.query(Post).filter(
-        Post.userID.notin_(followed_user_ids),
+def getFeedPage(session, userID: int, user_filter, limit, after=None):
+    query = select(Post.postID, Post.createdDate).filter(
+        user_filter,
         Post.userID != userID,
-        Post.status.ilike("public"),
-        ~session.query(seen_alias).filter(
-            seen_alias.postID == Post.postID,
-            seen_alias.userID == userID
-        ).exists()
-    ).order_by(Post.createdDate.desc()).limit(limit).all()
+        Post.status == "PUBLIC",
+        notSeen(userID, Post.postID)
+    )
 
+    if after:
+        query = query.filter(afterCursor(after))
 
-def getFollowing(session, user_id):
-    try:
-        user = session.query(User).filter(User.userID == user_id).one_or_none()
-        if not user:
-            return 404, f"User with ID {user_id} does not exist."
-
-        following = [
-            {
-                "userID": follow.followed.userID,
-                "username": follow.followed.username,
-                "email": follow.followed.email,
-            }
-            for follow in user.following
-        ]
-        return 200, following
+    return session.execute(
+        query.order_by(Post.createdDate.desc(), Post.postID.desc()).limit(limit)
+    ).all()
 
-    except Exception as e:
-        return handle_exception(e, "getFollowing")
+
+def getInboxPosts(session, userID: int, limit, after=None):
+    # Posts fanned out to this user on publish: a single range scan of the inbox
+    query = (
+        select(FeedInbox.postID, FeedInbox.createdDate)
+        .join(Post, Post.postID == FeedInbox.postID)
+        .filter(
+            FeedInbox.userID == userID,
+            Post.status == "PUBLIC",
+            notSeen(userID, FeedInbox.postID)
+        )
+    )
+
+    if after:
+        query = query.filter(afterCursor(after, FeedInbox.createdDate, FeedInbox.postID))
+
+    return session.execute(
+        query.order_by(FeedInbox.createdDate.desc(), FeedInbox.postID.desc()).limit(limit)
+    ).all()
+
+
+def getFollowedPosts(session, userID: int, followed_user_ids, limit, after=None):
+    posts = getInboxPosts(session, userID, limit, after)
+
+    # Authors with too many followers are not fanned out, read their posts directly
+    read_authors = get_fanout_on_read_authors(session, followed_user_ids)
+    if read_authors:
+        posts += getFeedPage(session, userID, Post.userID.in_(read_authors), limit, after)
+
+    unique_posts = {row.postID: row for row in posts}.values()
+    return sorted(
+        unique_posts,
+        key=lambda row: (row.createdDate is not None, row.createdDate or date.min, row.postID),
+        reverse=True
+    )[:limit]
+
+
+def getNonFollowedPosts(session, userID: int, followed_user_ids, limit, after=None):
+    return getFeedPage(session, userID, Post.userID.notin_(followed_user_ids), limit, after)
+
+
+def getFollowedUserIds(session, userID: int):
+    return set(session.execute(
+        select(Follow.followedId).where(Follow.followerId == userID)
+    ).scalars())
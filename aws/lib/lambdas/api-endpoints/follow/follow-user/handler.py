@@ -2,6 +2,7 @@ import json
 from utils import create_response, handle_exception
 from sqlalchemy import select, and_
 from sqlalchemy_utils import session_handler, get_user_by_email
+from feed_utils import backfill_inbox, update_follower_count
 from dripdrop_orm_objects import Follow, User
 
 def handler(event, context):
@@ -51,6 +52,8 @@ def createFollow(session, email, followedId):
         # Create and add follow relationship
         new_follow = Follow(followedId=followed_user.userID, followerId=user.userID)
         session.add(new_follow)
+        update_follower_count(session, followed_user.userID, 1)
+        backfill_inbox(session, user.userID, followed_user.userID)
 
         return 201, f"Follow relationship created between followerUuid: {user.uuid} and followedUuid: {followed_user.uuid}"
 
@@ -2,6 +2,7 @@ import json
 from utils import create_response, handle_exception
 from sqlalchemy import select, and_
 from sqlalchemy_utils import session_handler, get_user_by_email
+from feed_utils import remove_author_from_inbox, update_follower_count
 from dripdrop_orm_objects import Follow, User
 
 def handler(event, context):    
@@ -41,6 +42,8 @@ def deleteFollow(session, email, followedId):
 
         if follow:
             session.delete(follow)
+            update_follower_count(session, followed_user.userID, -1)
+            remove_author_from_inbox(session, user.userID, followed_user.userID)
             return 200, 'Follow relationship was removed successfully'
         else:
             return 404, 'Follow relationship was not found'
@@ -0,0 +1,102 @@
+from sqlalchemy_utils import session_handler, get_user_by_email
+from utils import create_response, handle_exception
+from post_utils import serialize_posts
+from item_index import get_item_index
+from dripdrop_orm_objects import Post, Tag
+from sqlalchemy import select
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+# Default color closeness in delta E; around 10 is a clearly similar shade
+DEFAULT_MAX_COLOR_DISTANCE = 20.0
+
+# Several items of one post can match; take this many items per requested post
+ITEMS_PER_POST = 4
+
+FACETS = ('tags', 'itemType', 'brand', 'category', 'minPrice', 'maxPrice', 'color')
+
+def handler(event, context):
+    try:
+        query_params = event.get('queryStringParameters') or {}
+        email = event['requestContext']['authorizer']['claims']['email']
+
+        if not any(query_params.get(facet) for facet in FACETS):
+            return create_response(400, f"Provide at least one of: {', '.join(FACETS)}")
+
+        status_code, message = searchItems(email, query_params)
+        return create_response(status_code, message)
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return create_response(500, f"Error searching items: {str(e)}")
+
+
+@session_handler
+def searchItems(session, email, query_params):
+    user = get_user_by_email(session, email)
+    userID = user.userID
+
+    try:
+        limit = min(parseNumber(query_params, 'limit', int) or DEFAULT_LIMIT, MAX_LIMIT)
+        color = parseColor(query_params.get('color'))
+        max_distance = parseNumber(query_params, 'maxColorDistance', float) or DEFAULT_MAX_COLOR_DISTANCE
+
+        tag_names = [tag.strip().lower() for tag in (query_params.get('tags') or '').split(',') if tag.strip()]
+        tag_ids = []
+        if tag_names:
+            tag_ids = session.execute(select(Tag.tagID).where(Tag.tag.in_(tag_names))).scalars().all()
+            # Every tag is required, so an unknown one matches nothing
+            if len(tag_ids) < len(set(tag_names)):
+                return 200, []
+
+        index = get_item_index(session)
+        matches = index.search(
+            limit * ITEMS_PER_POST,
+            tag_ids=tag_ids,
+            item_type=query_params.get('itemType'),
+            brand=query_params.get('brand'),
+            category=query_params.get('category'),
+            min_price=parseNumber(query_params, 'minPrice', float),
+            max_price=parseNumber(query_params, 'maxPrice', float),
+            color=color,
+            max_distance=max_distance,
+        )
+
+        candidate_post_ids = list(dict.fromkeys(post_id for _, post_id, _ in matches))
+        if not candidate_post_ids:
+            return 200, []
+
+        # Visibility can change after indexing, so check it against the posts table
+        public_post_ids = set(session.execute(
+            select(Post.postID).where(Post.postID.in_(candidate_post_ids), Post.status == "PUBLIC")
+        ).scalars())
+
+        post_ids = [post_id for post_id in candidate_post_ids if post_id in public_post_ids][:limit]
+        return 200, serialize_posts(session, post_ids, userID)
+
+    except Exception as e:
+        return handle_exception(e, "Error searching items")
+
+
+def parseNumber(query_params, name, cast):
+    value = query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise Exception("400", f"Invalid {name}: {value}")
+
+
+def parseColor(value):
+    """Hex color without the '#', e.g. 1e3a8a, as an (r, g, b) tuple."""
+    if not value:
+        return None
+    value = value.lstrip('#')
+    if len(value) != 6:
+        raise Exception("400", f"Invalid color: {value}")
+    try:
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        raise Exception("400", f"Invalid color: {value}")
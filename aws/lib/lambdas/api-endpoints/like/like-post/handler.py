@@ -2,6 +2,7 @@ import json
 from utils import create_response, handle_exception
 from sqlalchemy import select, and_
 from sqlalchemy_utils import session_handler, get_user_by_email
+from post_utils import update_post_counter
 from dripdrop_orm_objects import Like, User, Post
 
 def handler(event, context):
@@ -44,6 +45,7 @@ def createLike(session, email, postId):
 
         new_like = Like(userID=user.userID, postID=postId)
         session.add(new_like)
+        update_post_counter(session, postId, "likeCount", 1)
 
         return 201, f"User {email} liked post {postId} successfully."
 
@@ -2,6 +2,7 @@ import json
 from utils import create_response, handle_exception
 from sqlalchemy import select
 from sqlalchemy_utils import session_handler, get_user_by_email
+from post_utils import update_post_counter
 from dripdrop_orm_objects import Like
 
 def handler(event, context):    
@@ -35,6 +36,7 @@ def deleteLike(session, email, postId):
             return 404, "Like was not found."
 
         session.delete(like)
+        update_post_counter(session, postId, "likeCount", -1)
         return 200, "Like was removed successfully."
 
     except Exception as e:
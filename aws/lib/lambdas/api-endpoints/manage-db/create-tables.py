@@ -26,6 +26,11 @@ def handler(event, context):
         
         result = Base.metadata.create_all(engine)
 
+        # create_all skips existing tables, so add any indexes they are missing
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
+
         #Use SQLAlchemy Inspector to get table names
         inspector = inspect(engine)
         tables = inspector.get_table_names()
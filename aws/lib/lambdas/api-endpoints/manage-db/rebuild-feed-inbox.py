@@ -0,0 +1,39 @@
+from sqlalchemy import select, delete
+from sqlalchemy_utils import session_handler, insert_ignore
+from feed_utils import FANOUT_FOLLOWER_LIMIT
+from dripdrop_orm_objects import Post, User, Follow, FeedInbox
+from utils import create_response, handle_exception
+
+def handler(event, context):
+    try:
+        status_code, message = rebuildFeedInbox()
+        return create_response(status_code, message)
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return create_response(500, f"Error rebuilding feed inbox: {str(e)}")
+
+
+@session_handler
+def rebuildFeedInbox(session):
+    try:
+        session.execute(delete(FeedInbox))
+
+        # Fan out every public post of every author below the fan-out limit in one statement
+        fanned_out = (
+            select(Follow.followerId, Post.postID, Post.userID, Post.createdDate)
+            .join(Post, Post.userID == Follow.followedId)
+            .join(User, User.userID == Follow.followedId)
+            .where(Post.status == "PUBLIC", User.followerCount <= FANOUT_FOLLOWER_LIMIT)
+        )
+
+        result = session.execute(
+            insert_ignore(session, FeedInbox).from_select(
+                ["userID", "postID", "authorID", "createdDate"], fanned_out
+            )
+        )
+
+        return 200, f"Feed inbox rebuilt with {result.rowcount} entries."
+
+    except Exception as e:
+        return handle_exception(e, "rebuildFeedInbox")
@@ -0,0 +1,83 @@
+from sqlalchemy import select, update, func, inspect, text
+from sqlalchemy_utils import session_handler
+from dripdrop_orm_objects import Post, User, Like, Comment, Bookmark, Follow
+from utils import create_response, handle_exception
+
+# Number of rows rebuilt per UPDATE statement
+BATCH_SIZE = 5000
+
+# (model, counter column) -> (source table, column referencing the model's key)
+COUNTER_SOURCES = {
+    (Post, "likeCount"): (Like, Like.postID),
+    (Post, "commentCount"): (Comment, Comment.postID),
+    (Post, "bookmarkCount"): (Bookmark, Bookmark.postID),
+    (User, "followerCount"): (Follow, Follow.followedId),
+}
+
+def handler(event, context):
+    try:
+        event = event or {}
+        batch_size = int(event.get('batchSize', BATCH_SIZE))
+
+        status_code, message = reconcileCounters(batch_size)
+        return create_response(status_code, message)
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return create_response(500, f"Error reconciling counters: {str(e)}")
+
+
+@session_handler
+def reconcileCounters(session, batch_size=BATCH_SIZE):
+    try:
+        addMissingCounterColumns(session)
+
+        updated = 0
+        for (model, counter), (source, reference) in COUNTER_SOURCES.items():
+            updated += reconcileCounter(session, model, counter, source, reference, batch_size)
+
+        return 200, f"Reconciled counters, {updated} counter values corrected."
+
+    except Exception as e:
+        return handle_exception(e, "reconcileCounters")
+
+
+def reconcileCounter(session, model, counter, source, reference, batch_size):
+    key = model.__mapper__.primary_key[0]
+    min_id, max_id = session.execute(select(func.min(key), func.max(key))).one()
+
+    if min_id is None:
+        return 0
+
+    actual = (
+        select(func.count())
+        .select_from(source)
+        .where(reference == key)
+        .scalar_subquery()
+    )
+    column = getattr(model, counter)
+
+    updated = 0
+    for start in range(min_id, max_id + 1, batch_size):
+        end = start + batch_size - 1
+        # One correlated UPDATE rebuilds a whole key range
+        result = session.execute(
+            update(model)
+            .where(key.between(start, end), column != actual)
+            .values({column: actual})
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+        session.commit()
+
+    return updated
+
+
+def addMissingCounterColumns(session):
+    # create_all does not add columns to an existing table
+    for (model, counter) in COUNTER_SOURCES:
+        table = model.__tablename__
+        existing = {column["name"] for column in inspect(session.connection()).get_columns(table)}
+        if counter not in existing:
+            print(f"Adding missing column {table}.{counter}")
+            session.execute(text(f"ALTER TABLE {table} ADD COLUMN {counter} INTEGER NOT NULL DEFAULT 0"))
@@ -1,9 +1,15 @@
 from sqlalchemy_utils import session_handler, get_user_by_email
 from utils import create_response, handle_exception
-from dripdrop_orm_objects import Post, ClothingItemTag, Image, Item, ClothingItemDetails
-from sqlalchemy import select, func, desc
-from sqlalchemy.orm import aliased
-from datetime import datetime, date
+from post_utils import serialize_posts
+from item_index import get_item_index
+from recommendation_cache import get_cache_entry, is_fresh, store_recommendations
+from dripdrop_orm_objects import Post
+from sqlalchemy import select
+
+RECOMMENDATION_LIMIT = 25
+
+# Several items of one post can match; rank this many items to fill the limit with posts
+CANDIDATE_ITEMS = RECOMMENDATION_LIMIT * 4
 
 def handler(event, context):
     try:
@@ -29,108 +35,36 @@ def getAiRecommendations(session, email, item_id):
     userID = user.userID
 
     try:
-        target_item = aliased(ClothingItemTag)
-        matching_item = aliased(ClothingItemTag)
-
-        original_post_id = (
-            session.query(Post.postID)
-            .join(Image, Post.postID == Image.postID)
-            .join(Item, Image.imageID == Item.imageID)
-            .filter(Item.clothingItemID == item_id)
-            .scalar()
-        )
-
-        if not original_post_id:
-            return 404, "Original post not found for the given item ID"
-
-        # Get the original color and type
-        item_details = (
-            session.query(
-                ClothingItemDetails.red,
-                ClothingItemDetails.green,
-                ClothingItemDetails.blue,
-                ClothingItemDetails.itemType
-            )
-            .filter(ClothingItemDetails.clothingItemID == item_id)
-            .first()
-        )
-
-        if not item_details:
+        try:
+            item_id = int(item_id)
+        except ValueError:
+            raise Exception("400", "Invalid item ID")
+
+        # Only the ranking is cached; posts are serialized on every read so counts stay current
+        entry = get_cache_entry(session, item_id)
+        if is_fresh(entry):
+            return 200, serialize_posts(session, entry.postIDs, userID)
+
+        # A missing entry may have been invalidated because new items were added, load them first
+        index = get_item_index(session, load_new=entry is None)
+
+        matches = index.nearest(item_id, CANDIDATE_ITEMS)
+        if matches is None:
             return 404, "Original item details not found"
 
-        target_red, target_green, target_blue, target_type = item_details
-        tolerance = 40
-
-        def fetch_recommendations(with_color=True):
-            query = (
-                session.query(Post)
-                .join(Image, Post.postID == Image.postID)
-                .join(Item, Image.imageID == Item.imageID)
-                .join(matching_item, matching_item.clothingItemID == Item.clothingItemID)
-                .join(target_item, target_item.tagID == matching_item.tagID)
-                .join(ClothingItemDetails, ClothingItemDetails.clothingItemID == matching_item.clothingItemID)
-                .filter(
-                    target_item.clothingItemID == item_id,
-                    matching_item.clothingItemID != item_id,
-                    Post.status.ilike("public"),
-                    Post.postID != original_post_id,
-                    ClothingItemDetails.itemType == target_type  # filter by same type
-                )
-            )
-
-            if with_color:
-                query = query.filter(
-                    ClothingItemDetails.red.between(target_red - tolerance, target_red + tolerance),
-                    ClothingItemDetails.green.between(target_green - tolerance, target_green + tolerance),
-                    ClothingItemDetails.blue.between(target_blue - tolerance, target_blue + tolerance),
-                )
-
-            return (
-                query.group_by(Post.postID)
-                .having(func.count(matching_item.tagID) >= 2)
-                .order_by(desc(func.count(matching_item.tagID)))
-                .limit(25)
-                .all()
-            )
-
-        # First try with color + type filtering
-        recommended_posts = fetch_recommendations(with_color=True)
-
-        # If none found, retry without color but still enforce same type
-        if not recommended_posts:
-            print("No color-matching posts found, falling back to type-only matching.")
-            recommended_posts = fetch_recommendations(with_color=False)
-
-        if recommended_posts:
-            posts_list = [
-                {
-                    "postID": post.postID,
-                    "uuid": post.userRel.uuid,
-                    "status": post.status,
-                    "caption": post.caption,
-                    "createdDate": (
-                        post.createdDate.isoformat()
-                        if isinstance(post.createdDate, (datetime, date))
-                        else post.createdDate
-                    ),
-                    "images": [
-                        {"imageID": image.imageID, "imageURL": image.imageURL}
-                        for image in post.images
-                    ],
-                    "numLikes": len(post.likes),
-                    "numComments": len(post.comments),
-                    "user": {
-                        "username": post.userRel.username,
-                        "profilePic": post.userRel.profilePicURL,
-                    },
-                    "userHasLiked": int(userID) in {like.userID for like in post.likes},
-                    "userHasSaved": int(userID) in {bookmark.userID for bookmark in post.bookmarks},
-                }
-                for post in recommended_posts
-            ]
-            return 200, posts_list
-
-        return 200, []
+        candidate_post_ids = list(dict.fromkeys(post_id for _, post_id, _ in matches))
+
+        # Visibility can change after indexing, so check it against the posts table
+        public_post_ids = set()
+        if candidate_post_ids:
+            public_post_ids = set(session.execute(
+                select(Post.postID).where(Post.postID.in_(candidate_post_ids), Post.status == "PUBLIC")
+            ).scalars())
+
+        post_ids = [post_id for post_id in candidate_post_ids if post_id in public_post_ids][:RECOMMENDATION_LIMIT]
+        store_recommendations(session, item_id, index.item_type(item_id), post_ids, entry)
+
+        return 200, serialize_posts(session, post_ids, userID)
 
     except Exception as e:
         return handle_exception(e, "Error accessing database")
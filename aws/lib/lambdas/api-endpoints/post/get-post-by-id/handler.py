@@ -44,8 +44,8 @@ def getPostById(session, post_id):
                 {"imageID": image.imageID, "imageURL": image.imageURL}
                 for image in post.images
             ],
-            "numLikes": len(post.likes),
-            "numComments": len(post.comments),
+            "numLikes": post.likeCount,
+            "numComments": post.commentCount,
         }
 
         return 200, post_data
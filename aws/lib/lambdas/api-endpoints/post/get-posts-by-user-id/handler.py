@@ -1,10 +1,9 @@
 from sqlalchemy import select
 from sqlalchemy_utils import session_handler
-from sqlalchemy.orm import joinedload
 from sqlalchemy.exc import NoResultFound
 from utils import create_response, handle_exception
+from post_utils import serialize_posts
 from dripdrop_orm_objects import Post, User
-from datetime import datetime, date
 
 def handler(event, context):
     try:
@@ -33,13 +32,8 @@ def getPostsByUserId(session, uuid, post_status=None):
     try:
         # Query to fetch posts of the user with the given UUID
         query = (
-            select(Post)
+            select(Post.postID)
             .join(Post.userRel)  # Join with the User table
-            .options(
-                joinedload(Post.images),  # Eager load images
-                joinedload(Post.likes),   # Eager load likes
-                joinedload(Post.comments) # Eager load comments
-            )
             .where(User.uuid == uuid)  # Filter by user's UUID
         )
 
@@ -48,33 +42,10 @@ def getPostsByUserId(session, uuid, post_status=None):
             query = query.where(Post.status == post_status)
 
         # Execute the query and fetch results
-        posts_result = session.execute(query).unique().scalars().all()
+        post_ids = session.execute(query).scalars().all()
 
         # Construct the response
-        posts_list = [
-            {
-                "postID": post.postID,
-                "uuid": post.userRel.uuid,
-                "status": post.status,
-                "caption": post.caption,
-                "createdDate": (
-                    post.createdDate.isoformat()
-                    if isinstance(post.createdDate, (datetime, date))
-                    else str(post.createdDate)
-                ),
-                "images": [
-                    {"imageID": image.imageID, "imageURL": image.imageURL}
-                    for image in post.images
-                ],
-                "numLikes": len(post.likes),
-                "numComments": len(post.comments),
-                "user": {
-                    "username": post.userRel.username,
-                    "profilePic": post.userRel.profilePicURL,
-                },
-            }
-            for post in posts_result
-        ]
+        posts_list = serialize_posts(session, post_ids)
 
         return 200, posts_list
 
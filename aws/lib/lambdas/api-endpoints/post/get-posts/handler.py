@@ -19,7 +19,7 @@ def getPosts(session):
     try:
         posts_result = (
             session.query(Post)
-            .options(joinedload(Post.images), joinedload(Post.likes), joinedload(Post.comments))
+            .options(joinedload(Post.images), joinedload(Post.userRel))
             .all()
         )
 
@@ -38,8 +38,8 @@ def getPosts(session):
                     {"imageID": image.imageID, "imageURL": image.imageURL}
                     for image in post.images
                 ],
-                "numLikes": len(post.likes),
-                "numComments": len(post.comments),
+                "numLikes": post.likeCount,
+                "numComments": post.commentCount,
             }
             for post in posts_result
         ]
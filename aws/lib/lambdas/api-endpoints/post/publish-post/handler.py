@@ -1,6 +1,7 @@
 from utils import create_response, handle_exception
 from sqlalchemy import select
 from sqlalchemy_utils import session_handler
+from feed_utils import fanout_post
 from dripdrop_orm_objects import Post
 
 def handler(event, context):
@@ -27,7 +28,13 @@ def publish_post(session, post_id):
         if not post:
             return 404, f'Post with postID: {post_id} not found'
 
-        post.status = 'public'
+        was_public = (post.status or '').upper() == 'PUBLIC'
+        post.status = 'PUBLIC'
+
+        # Push the post into the followers' feed inboxes on the transition to public
+        if not was_public:
+            fanout_post(session, post)
+
         return 200, f'Post with postID: {post_id} has been published'
 
     except Exception as e:
@@ -1,9 +1,29 @@
-import json
+import re
+from datetime import date
 from utils import create_response, handle_exception
-from sqlalchemy import select
+from sqlalchemy import select, func, and_, or_, desc, literal
+from sqlalchemy.dialects.mysql import match
 from sqlalchemy_utils import session_handler, get_user_by_email
-from dripdrop_orm_objects import Post, Like
-from datetime import datetime, date
+from post_utils import serialize_posts
+from item_index import get_item_index
+from dripdrop_orm_objects import Post, Tag
+
+SEARCH_LIMIT = 20
+
+# Matches taken from each source (captions, tags) before ranking
+CANDIDATE_LIMIT = 200
+
+# A post's relevance halves every this many days
+RECENCY_HALF_LIFE_DAYS = 30
+
+# Tags a query can resolve to; short prefixes match many tags
+MAX_MATCHED_TAGS = 50
+
+# Weight of matching item tags relative to matching the caption
+TAG_MATCH_WEIGHT = 0.5
+
+# Longer queries are cut to this many words
+MAX_SEARCH_TERMS = 5
 
 def handler(event, context):
     try:
@@ -26,46 +46,89 @@ def searchPosts(session, search_string, email):
         user = get_user_by_email(session, email)
         userID = user.userID
 
-        # Get up to 20 posts matching the search string
-        posts = session.execute(
-            select(Post)
-            .filter(
-                Post.caption.ilike(f"%{search_string}%"),
-                Post.status == "PUBLIC",
-                Post.userID != userID,
-            )
-            .limit(20)
-        ).scalars().all()
-
-        posts_list = [
-            {
-                "postID": post.postID,
-                "uuid": post.userRel.uuid if post.userRel else None,
-                "status": post.status,
-                "caption": post.caption,
-                "createdDate": (
-                    post.createdDate.isoformat()
-                    if isinstance(post.createdDate, (datetime, date))
-                    else str(post.createdDate)
-                ),
-                "images": [
-                    {"imageID": image.imageID, "imageURL": image.imageURL}
-                    for image in post.images
-                ],
-                "numLikes": len(post.likes),
-                "numComments": len(post.comments),
-                "userHasLiked": int(userID) in {like.userID for like in post.likes},
-                "userHasSaved": int(userID) in {bookmark.userID for bookmark in post.bookmarks},
-                "user": {
-                    "username": post.userRel.username,
-                    "profilePic": post.userRel.profilePicURL,
-                },
-            }
-            for post in posts
-        ]
+        terms = tokenize(search_string)
+        if not terms:
+            return 200, []
+
+        visible = and_(Post.status == "PUBLIC", Post.userID != userID)
+
+        caption_matches = getCaptionMatches(session, terms, visible)
+        tag_matches = getTagMatches(session, terms, visible)
+
+        post_ids = rankPosts(caption_matches, tag_matches, len(terms))[:SEARCH_LIMIT]
+        posts_list = serialize_posts(session, post_ids, userID)
 
         return 200, posts_list
 
     except Exception as e:
         return handle_exception(e, "Error accessing database")
 
+
+def tokenize(search_string):
+    # Letters and digits only, which also keeps full-text operators out of the query
+    return list(dict.fromkeys(re.findall(r"[^\W_]+", search_string.lower())))[:MAX_SEARCH_TERMS]
+
+
+def getCaptionMatches(session, terms, visible):
+    """{postID: (relevance, createdDate)} for posts whose caption has every term as a word prefix."""
+    if session.get_bind().dialect.name == "mysql":
+        # FULLTEXT index lookup; every term is required and may be a prefix
+        relevance = match(Post.caption, against=" ".join(f"+{term}*" for term in terms)).in_boolean_mode()
+        query = (
+            select(Post.postID, Post.createdDate, relevance.label("relevance"))
+            .where(relevance > 0, visible)
+            .order_by(desc("relevance"), Post.createdDate.desc())
+        )
+    else:
+        query = (
+            select(Post.postID, Post.createdDate, literal(1).label("relevance"))
+            .where(and_(*(Post.caption.ilike(f"%{term}%") for term in terms)), visible)
+            .order_by(Post.createdDate.desc())
+        )
+
+    rows = session.execute(query.limit(CANDIDATE_LIMIT)).all()
+    return {postID: (float(relevance), createdDate) for postID, createdDate, relevance in rows}
+
+
+def getTagMatches(session, terms, visible):
+    """{postID: (matched term count, createdDate)} for posts with items tagged with a word starting with a term."""
+    # Prefix matches use the unique index on tags.tag
+    tags = session.execute(
+        select(Tag.tagID, Tag.tag)
+        .where(or_(*(Tag.tag.like(f"{term}%") for term in terms)))
+        .order_by(func.length(Tag.tag), Tag.tagID)
+        .limit(MAX_MATCHED_TAGS)
+    ).all()
+
+    if not tags:
+        return {}
+
+    tag_id_groups = [[tagID for tagID, tag in tags if tag.lower().startswith(term)] for term in terms]
+    counts = dict(get_item_index(session).posts_with_tags(tag_id_groups, CANDIDATE_LIMIT))
+    if not counts:
+        return {}
+
+    # The index can lag behind visibility changes, so check it against the posts table
+    rows = session.execute(
+        select(Post.postID, Post.createdDate).where(Post.postID.in_(counts), visible)
+    ).all()
+
+    return {postID: (float(counts[postID]), createdDate) for postID, createdDate in rows}
+
+
+def rankPosts(caption_matches, tag_matches, num_terms):
+    """Post IDs ordered by caption relevance plus weighted tag matches, decayed by age."""
+    top_caption = max((relevance for relevance, _ in caption_matches.values()), default=1.0) or 1.0
+    today = date.today()
+
+    scores = {}
+    for postID in caption_matches.keys() | tag_matches.keys():
+        caption_relevance, createdDate = caption_matches.get(postID, (0.0, None))
+        tag_count, tag_date = tag_matches.get(postID, (0.0, None))
+        createdDate = createdDate or tag_date
+
+        relevance = caption_relevance / top_caption + TAG_MATCH_WEIGHT * min(tag_count, num_terms) / num_terms
+        age_days = (today - createdDate).days if createdDate else 365
+        scores[postID] = relevance * 0.5 ** (max(age_days, 0) / RECENCY_HALF_LIFE_DAYS)
+
+    return sorted(scores, key=lambda postID: (-scores[postID], -postID))
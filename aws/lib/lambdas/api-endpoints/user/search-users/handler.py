@@ -1,18 +1,28 @@
-import json
 from utils import create_response, handle_exception
 from sqlalchemy import select
 from sqlalchemy_utils import session_handler, get_user_by_email
-from dripdrop_orm_objects import User
+from username_index import get_username_index
+from dripdrop_orm_objects import User, Follow
+
+TYPEAHEAD_LIMIT = 20
+
+# Most-followed prefix matches checked against the caller's follows; followed
+# users among them are moved to the front
+TYPEAHEAD_CANDIDATES = 200
 
 def handler(event, context):
     try:
         search_string = event['pathParameters'].get('searchString')
         email = event['requestContext']['authorizer']['claims']['email']
+        query_params = event.get('queryStringParameters') or {}
 
         if not search_string:
             return create_response(400, 'Missing searchString')
 
-        status_code, message = searchUsers(search_string, email)
+        if query_params.get('mode') == 'typeahead':
+            status_code, message = typeaheadUsers(search_string, email)
+        else:
+            status_code, message = searchUsers(search_string, email)
         return create_response(status_code, message)
 
     except Exception as e:
@@ -45,3 +55,44 @@ def searchUsers(session, search_string, email):
 
     except Exception as e:
         return handle_exception(e, "Error accessing database")
+
+
+@session_handler
+def typeaheadUsers(session, prefix, email):
+    try:
+        user = get_user_by_email(session, email)
+
+        # Prefix lookup in the container's sorted username index, no table scan
+        index = get_username_index(session)
+        candidate_ids = index.top_matches(prefix, TYPEAHEAD_CANDIDATES, exclude_user_id=user.userID)
+
+        if not candidate_ids:
+            return 200, []
+
+        followed_ids = set(session.execute(
+            select(Follow.followedId).where(Follow.followerId == user.userID, Follow.followedId.in_(candidate_ids))
+        ).scalars())
+        user_ids = sorted(candidate_ids, key=lambda userID: userID not in followed_ids)[:TYPEAHEAD_LIMIT]
+
+        # Current details; users deleted since the index was loaded drop out here
+        rows = {
+            row.userID: row for row in session.execute(
+                select(User.userID, User.username, User.uuid, User.profilePicURL, User.followerCount)
+                .where(User.userID.in_(user_ids))
+            )
+        }
+
+        users_list = [
+            {
+                "username": rows[userID].username,
+                "uuid": rows[userID].uuid,
+                "profilePic": rows[userID].profilePicURL,
+                "followerCount": rows[userID].followerCount,
+                "isFollowing": userID in followed_ids,
+            } for userID in user_ids if userID in rows
+        ]
+
+        return 200, users_list
+
+    except Exception as e:
+        return handle_exception(e, "Error accessing database")
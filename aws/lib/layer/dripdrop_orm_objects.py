@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Float, Boolean, Index, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, Date, DateTime, Float, Boolean, Index, UniqueConstraint, JSON
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -15,6 +15,9 @@ class User(Base):
     accountType = Column(String(10), nullable=False, default="USER_FREE")
     dob = Column(Date, nullable=False)
 
+    # Denormalized counter, kept in sync by the follow/unfollow handlers
+    followerCount = Column(Integer, nullable=False, default=0, server_default="0")
+
     posts = relationship("Post", back_populates="userRel", cascade="all, delete-orphan")
     following = relationship("Follow", foreign_keys="Follow.followerId", back_populates="follower", cascade="all, delete-orphan")
     followers = relationship("Follow", foreign_keys="Follow.followedId", back_populates="followed", cascade="all, delete-orphan")
@@ -61,6 +64,11 @@ class Post(Base):
     status = Column(String(15), nullable=False, default="PRIVATE")
     createdDate = Column(Date)
 
+    # Denormalized counters, kept in sync by the like/comment/bookmark handlers
+    likeCount = Column(Integer, nullable=False, default=0, server_default="0")
+    commentCount = Column(Integer, nullable=False, default=0, server_default="0")
+    bookmarkCount = Column(Integer, nullable=False, default=0, server_default="0")
+
     userRel = relationship("User", back_populates="posts")
     images = relationship("Image", back_populates="postRel", cascade="all, delete-orphan")
     has_seen = relationship("HasSeen", back_populates="post", cascade="all, delete-orphan")
@@ -68,6 +76,14 @@ class Post(Base):
     likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
     bookmarks = relationship("Bookmark", back_populates="post", cascade="all, delete-orphan")
 
+    # Keyset pagination indexes for the feed: (createdDate, postID) descending
+    __table_args__ = (
+        Index('idx_post_status_created', 'status', 'createdDate', 'postID'),
+        Index('idx_post_user_created', 'userID', 'createdDate', 'postID'),
+        # Caption search; a plain index on other dialects
+        Index('idx_post_caption_fulltext', 'caption', mysql_prefix='FULLTEXT'),
+    )
+
 
 # HasSeen table
 class HasSeen(Base):
@@ -84,6 +100,19 @@ class HasSeen(Base):
         Index('idx_user_post', 'userID', 'postID'),
     )
 
+# FeedInbox table: posts fanned out to each follower when they are published
+class FeedInbox(Base):
+    __tablename__ = 'feed_inbox'
+    userID = Column(Integer, ForeignKey('users.userID', ondelete="CASCADE"), primary_key=True)
+    postID = Column(Integer, ForeignKey('posts.postID', ondelete="CASCADE"), primary_key=True)
+    authorID = Column(Integer, ForeignKey('users.userID', ondelete="CASCADE"), nullable=False)
+    createdDate = Column(Date)
+
+    __table_args__ = (
+        Index('idx_inbox_user_created', 'userID', 'createdDate', 'postID'),
+        Index('idx_inbox_user_author', 'userID', 'authorID'),
+    )
+
 # Image table
 class Image(Base):
     __tablename__ = 'images'
@@ -135,6 +164,18 @@ class ClothingItemDetails(Base):
 
     clothing_item = relationship("ClothingItem", back_populates="details")
 
+# RecommendationCache table: viewer independent get-ai-recommendations results per item
+class RecommendationCache(Base):
+    __tablename__ = 'recommendation_cache'
+    clothingItemID = Column(Integer, ForeignKey('clothing_items.clothingItemID', ondelete="CASCADE"), primary_key=True)
+    itemType = Column(String(50))
+    postIDs = Column(JSON, nullable=False)
+    createdAt = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('idx_reccache_item_type', 'itemType'),
+    )
+
 # Coordinate table
 class Coordinate(Base):
     __tablename__ = 'coordinates'
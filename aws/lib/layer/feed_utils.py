@@ -0,0 +1,122 @@
+import os
+from sqlalchemy import select, update, delete, literal
+from sqlalchemy_utils import insert_ignore
+from dripdrop_orm_objects import Post, User, Follow, FeedInbox
+
+# Authors with more followers than this are not fanned out on write;
+# their posts are merged into followers' feeds at read time instead.
+FANOUT_FOLLOWER_LIMIT = int(os.getenv("FANOUT_FOLLOWER_LIMIT", 5000))
+
+# Number of recent posts copied into an inbox when a new follow is created
+INBOX_BACKFILL_LIMIT = 50
+
+
+def fanout_post(session, post):
+    """
+    Push a newly public post into the inbox of every follower of its author
+    with a single INSERT ... SELECT. Returns False when the author has too many
+    followers and the post is left to fan-out-on-read.
+    """
+    follower_count = session.execute(
+        select(User.followerCount).where(User.userID == post.userID)
+    ).scalar() or 0
+
+    if follower_count > FANOUT_FOLLOWER_LIMIT:
+        return False
+
+    followers = select(
+        Follow.followerId,
+        literal(post.postID),
+        literal(post.userID),
+        literal(post.createdDate),
+    ).where(Follow.followedId == post.userID)
+
+    session.execute(
+        insert_ignore(session, FeedInbox).from_select(
+            ["userID", "postID", "authorID", "createdDate"], followers
+        )
+    )
+    return True
+
+
+def backfill_inbox(session, followerID, authorID, limit=INBOX_BACKFILL_LIMIT):
+    """Copy the most recent public posts of a newly followed author into the follower's inbox."""
+    recent_posts = (
+        select(
+            literal(followerID),
+            Post.postID,
+            Post.userID,
+            Post.createdDate,
+        )
+        .where(Post.userID == authorID, Post.status == "PUBLIC")
+        .order_by(Post.createdDate.desc(), Post.postID.desc())
+        .limit(limit)
+    )
+
+    session.execute(
+        insert_ignore(session, FeedInbox).from_select(
+            ["userID", "postID", "authorID", "createdDate"], recent_posts
+        )
+    )
+
+
+def backfill_followers(session, authorID, limit=INBOX_BACKFILL_LIMIT):
+    """
+    Copy the most recent public posts of an author into the inbox of every
+    follower. Used when the author drops back to FANOUT_FOLLOWER_LIMIT, since
+    posts published while above it were never fanned out.
+    """
+    recent_posts = (
+        select(Post.postID, Post.userID, Post.createdDate)
+        .where(Post.userID == authorID, Post.status == "PUBLIC")
+        .order_by(Post.createdDate.desc(), Post.postID.desc())
+        .limit(limit)
+        .subquery()
+    )
+
+    session.execute(
+        insert_ignore(session, FeedInbox).from_select(
+            ["userID", "postID", "authorID", "createdDate"],
+            select(Follow.followerId, recent_posts.c.postID, recent_posts.c.userID, recent_posts.c.createdDate)
+            .where(Follow.followedId == authorID, Follow.followedId == recent_posts.c.userID),
+        )
+    )
+
+
+def remove_author_from_inbox(session, followerID, authorID):
+    session.execute(
+        delete(FeedInbox).where(
+            FeedInbox.userID == followerID,
+            FeedInbox.authorID == authorID,
+        )
+    )
+
+
+def get_fanout_on_read_authors(session, followed_user_ids):
+    """Followed authors whose posts are not fanned out and must be read from posts directly."""
+    if not followed_user_ids:
+        return set()
+
+    return set(session.execute(
+        select(User.userID).where(
+            User.userID.in_(followed_user_ids),
+            User.followerCount > FANOUT_FOLLOWER_LIMIT,
+        )
+    ).scalars())
+
+
+def update_follower_count(session, userID, delta):
+    session.execute(
+        update(User)
+        .where(User.userID == userID, User.followerCount + delta >= 0)
+        .values(followerCount=User.followerCount + delta)
+    )
+
+    # Crossing back to the limit switches the author to fan-out-on-write, and
+    # get-feed stops reading their posts directly
+    if delta < 0:
+        follower_count = session.execute(
+            select(User.followerCount).where(User.userID == userID)
+        ).scalar() or 0
+        if follower_count <= FANOUT_FOLLOWER_LIMIT < follower_count - delta:
+            backfill_followers(session, userID)
@@ -0,0 +1,344 @@
+import os
+import time
+import numpy as np
+from sqlalchemy import select
+from dripdrop_orm_objects import ClothingItemDetails, ClothingItemTag, Item, Image
+
+# New items (higher clothingItemID than any indexed one) are loaded this often
+ITEM_INDEX_REFRESH_SECONDS = int(os.getenv("ITEM_INDEX_REFRESH_SECONDS", 60))
+
+# Full rebuilds drop deleted items and pick up edited colors and tags
+ITEM_INDEX_REBUILD_SECONDS = int(os.getenv("ITEM_INDEX_REBUILD_SECONDS", 3600))
+
+# Ranking: one shared tag is worth this many delta E (CIE76) units of color distance
+TAG_WEIGHT = 10.0
+MIN_SHARED_TAGS = 2
+
+# Distance used when either item has no color
+MISSING_COLOR_DISTANCE = 100.0
+
+# sRGB (D65) to XYZ, and the D65 reference white
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883])
+_LAB_EPSILON = 216 / 24389
+_LAB_KAPPA = 24389 / 27
+
+# Number of set bits in every byte value
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def rgb_to_lab(rgb):
+    """Convert an (n, 3) array of 0-255 sRGB values to CIELAB. NaN channels stay NaN."""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    c = np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+    xyz = (c @ _RGB_TO_XYZ.T) / _D65_WHITE
+    f = np.where(xyz > _LAB_EPSILON, np.cbrt(xyz), (_LAB_KAPPA * xyz + 16) / 116)
+    return np.stack([
+        116 * f[:, 1] - 16,
+        500 * (f[:, 0] - f[:, 1]),
+        200 * (f[:, 1] - f[:, 2]),
+    ], axis=1)
+
+
+class ItemIndex:
+    """
+    Column arrays over every clothing item, sorted by clothingItemID:
+    owning post, itemType / brand / category codes, price, CIELAB color and a
+    tag bitset (bit n = tagID n). Facet searches intersect postings bitmaps
+    (one bit per item) per tag and per itemType, brand or category value; they
+    are packed with np.packbits, built on first use and kept until items are added.
+
+    Items are only ever appended in clothingItemID order, so an incremental
+    load fetches rows above the current maximum. Anything else (deletes,
+    edits, items committed out of ID order) is picked up by the next rebuild.
+    """
+
+    def __init__(self):
+        self._clear()
+        # time.monotonic() of the last rebuild / load, None until first use
+        self.built_at = None
+        self.refreshed_at = None
+
+    def _clear(self):
+        self.item_ids = np.empty(0, dtype=np.int64)
+        self.post_ids = np.empty(0, dtype=np.int64)
+        self.type_codes = np.empty(0, dtype=np.int32)
+        self.brand_codes = np.empty(0, dtype=np.int32)
+        self.category_codes = np.empty(0, dtype=np.int32)
+        self.prices = np.empty(0, dtype=np.float32)
+        self.lab = np.empty((0, 3), dtype=np.float32)
+        self.tag_bits = np.empty((0, 1), dtype=np.uint8)
+        self.types = _Vocabulary()
+        self.brands = _Vocabulary()
+        self.categories = _Vocabulary()
+        self._postings = {}
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    @property
+    def max_item_id(self):
+        return int(self.item_ids[-1]) if len(self.item_ids) else 0
+
+    def refresh(self, session, load_new=False):
+        """Rebuild if due, otherwise load new items if due or load_new is set. At most one load either way."""
+        now = time.monotonic()
+        if self.built_at is None or now - self.built_at >= ITEM_INDEX_REBUILD_SECONDS:
+            self.rebuild(session)
+        elif load_new or now - self.refreshed_at >= ITEM_INDEX_REFRESH_SECONDS:
+            self.load_new_items(session)
+
+    def rebuild(self, session):
+        start = time.perf_counter()
+        self._clear()
+        self.load_new_items(session)
+        self.built_at = self.refreshed_at
+        print(f"Item index rebuilt with {len(self)} items in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    def load_new_items(self, session):
+        """Append items with a higher clothingItemID than any indexed one. Returns the number added."""
+        after = self.max_item_id
+        self.refreshed_at = time.monotonic()
+
+        rows = session.execute(
+            select(
+                ClothingItemDetails.clothingItemID,
+                Image.postID,
+                ClothingItemDetails.itemType,
+                ClothingItemDetails.brand,
+                ClothingItemDetails.category,
+                ClothingItemDetails.price,
+                ClothingItemDetails.red,
+                ClothingItemDetails.green,
+                ClothingItemDetails.blue,
+            )
+            .join(Item, Item.clothingItemID == ClothingItemDetails.clothingItemID)
+            .join(Image, Image.imageID == Item.imageID)
+            .where(ClothingItemDetails.clothingItemID > after)
+            .order_by(ClothingItemDetails.clothingItemID)
+        ).all()
+
+        if not rows:
+            return 0
+
+        item_ids, post_ids, item_types, brands, categories, prices, red, green, blue = zip(*rows)
+        item_ids = np.array(item_ids, dtype=np.int64)
+        # Missing channels become NaN and are given MISSING_COLOR_DISTANCE when ranking
+        rgb = np.column_stack([np.array(channel, dtype=np.float64) for channel in (red, green, blue)])
+
+        tag_rows = session.execute(
+            select(ClothingItemTag.clothingItemID, ClothingItemTag.tagID)
+            .where(ClothingItemTag.clothingItemID > after)
+        ).all()
+        tag_bits = self._tag_bits(item_ids, tag_rows)
+
+        self.item_ids = np.concatenate([self.item_ids, item_ids])
+        self.post_ids = np.concatenate([self.post_ids, np.array(post_ids, dtype=np.int64)])
+        self.type_codes = np.concatenate([self.type_codes, self.types.codes(item_types)])
+        self.brand_codes = np.concatenate([self.brand_codes, self.brands.codes(brands)])
+        self.category_codes = np.concatenate([self.category_codes, self.categories.codes(categories)])
+        self.prices = np.concatenate([self.prices, np.array(prices, dtype=np.float32)])
+        self.lab = np.concatenate([self.lab, rgb_to_lab(rgb).astype(np.float32)])
+        self.tag_bits = np.concatenate([self._widen(self.tag_bits, tag_bits.shape[1]), self._widen(tag_bits, self.tag_bits.shape[1])])
+        self._postings = {}
+        return len(item_ids)
+
+    @staticmethod
+    def _tag_bits(item_ids, tag_rows):
+        bits = np.zeros((len(item_ids), 1), dtype=np.uint8)
+        if not tag_rows:
+            return bits
+
+        tag_item_ids, tag_ids = (np.array(column, dtype=np.int64) for column in zip(*tag_rows))
+        positions = np.searchsorted(item_ids, tag_item_ids)
+        found = positions < len(item_ids)
+        found[found] = item_ids[positions[found]] == tag_item_ids[found]
+        positions, tag_ids = positions[found], tag_ids[found]
+
+        bits = np.zeros((len(item_ids), int(tag_ids.max()) // 8 + 1 if len(tag_ids) else 1), dtype=np.uint8)
+        np.bitwise_or.at(bits, (positions, tag_ids // 8), (1 << (tag_ids % 8)).astype(np.uint8))
+        return bits
+
+    @staticmethod
+    def _widen(bits, width):
+        if bits.shape[1] >= width:
+            return bits
+        return np.pad(bits, ((0, 0), (0, width - bits.shape[1])))
+
+    def _position(self, item_id):
+        position = int(np.searchsorted(self.item_ids, item_id))
+        if position < len(self.item_ids) and self.item_ids[position] == item_id:
+            return position
+        return None
+
+    def __contains__(self, item_id):
+        return self._position(item_id) is not None
+
+    def item_type(self, item_id):
+        position = self._position(item_id)
+        if position is None or self.type_codes[position] < 0:
+            return None
+        return self.types.names[self.type_codes[position]]
+
+    def nearest(self, item_id, k):
+        """
+        Top k items of the same itemType from other posts, best first, as
+        (clothingItemID, postID, score) tuples. Candidates must share at least
+        MIN_SHARED_TAGS tags and are scored TAG_WEIGHT * shared tags - delta E,
+        so items without an itemType or with fewer tags get no recommendations.
+        Returns None if the item is not indexed.
+        """
+        target = self._position(item_id)
+        if target is None:
+            return None
+
+        target_bits = self.tag_bits[target]
+        if self.type_codes[target] < 0 or int(_POPCOUNT[target_bits].sum()) < MIN_SHARED_TAGS:
+            return []
+
+        candidates = np.flatnonzero(
+            (self.type_codes == self.type_codes[target]) & (self.post_ids != self.post_ids[target])
+        )
+
+        shared = _POPCOUNT[self.tag_bits[candidates] & target_bits].sum(axis=1, dtype=np.int32)
+        candidates, shared = candidates[shared >= MIN_SHARED_TAGS], shared[shared >= MIN_SHARED_TAGS]
+
+        distance = np.linalg.norm(self.lab[candidates] - self.lab[target], axis=1)
+        distance = np.where(np.isnan(distance), MISSING_COLOR_DISTANCE, distance)
+        scores = shared * TAG_WEIGHT - distance
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        return [
+            (int(self.item_ids[c]), int(self.post_ids[c]), float(s))
+            for c, s in zip(candidates[top], scores[top])
+        ]
+
+    def _posting(self, key, build):
+        """Packed bitmap over item positions, cached under key until items are added."""
+        bitmap = self._postings.get(key)
+        if bitmap is None:
+            bitmap = self._postings[key] = np.packbits(build())
+        return bitmap
+
+    def _tag_posting(self, tag_id):
+        def build():
+            if tag_id // 8 >= self.tag_bits.shape[1]:
+                return np.zeros(len(self), dtype=bool)
+            return (self.tag_bits[:, tag_id // 8] & (1 << (tag_id % 8))) != 0
+        return self._posting(("tag", tag_id), build)
+
+    def _value_posting(self, field, codes, names, value):
+        """Bitmap of items whose field equals value, ignoring case."""
+        value = value.strip().lower()
+        matching = [code for code, name in enumerate(names) if name is not None and name.strip().lower() == value]
+        return self._posting((field, value), lambda: np.isin(codes, matching))
+
+    def search(self, k, tag_ids=(), item_type=None, brand=None, category=None,
+               min_price=None, max_price=None, color=None, max_distance=None):
+        """
+        Items matching every given facet, as (clothingItemID, postID, delta E)
+        tuples. With a color (an RGB triple) only items within max_distance delta E
+        are kept, closest first, and delta E is None otherwise; without one the
+        newest items come first.
+        """
+        bitmaps = [self._tag_posting(tag_id) for tag_id in tag_ids]
+        if item_type is not None:
+            bitmaps.append(self._value_posting("itemType", self.type_codes, self.types.names, item_type))
+        if brand is not None:
+            bitmaps.append(self._value_posting("brand", self.brand_codes, self.brands.names, brand))
+        if category is not None:
+            bitmaps.append(self._value_posting("category", self.category_codes, self.categories.names, category))
+
+        if bitmaps:
+            positions = np.flatnonzero(np.unpackbits(np.bitwise_and.reduce(bitmaps), count=len(self)))
+        else:
+            positions = np.arange(len(self))
+
+        # Range filters only run over what the postings left; NaN prices never match
+        if min_price is not None:
+            positions = positions[self.prices[positions] >= min_price]
+        if max_price is not None:
+            positions = positions[self.prices[positions] <= max_price]
+
+        if color is None:
+            top = positions[::-1][:k]
+            return [(int(self.item_ids[p]), int(self.post_ids[p]), None) for p in top]
+
+        target = rgb_to_lab(np.array([color], dtype=np.float64))[0]
+        distance = np.linalg.norm(self.lab[positions] - target, axis=1)
+        close = distance <= max_distance
+        positions, distance = positions[close], distance[close]
+
+        if len(distance) > k:
+            top = np.argpartition(distance, k)[:k]
+        else:
+            top = np.arange(len(distance))
+        top = top[np.argsort(distance[top], kind="stable")]
+
+        return [
+            (int(self.item_ids[p]), int(self.post_ids[p]), float(d))
+            for p, d in zip(positions[top], distance[top])
+        ]
+
+
+    def posts_with_tags(self, tag_id_groups, k):
+        """
+        Up to k (postID, matched groups) pairs for posts with an item carrying
+        a tag from at least one group, most groups matched first, then newest
+        post. Each group is answered from the OR of its tags' postings.
+        """
+        matched_posts = []
+        for tag_ids in tag_id_groups:
+            bitmaps = [self._tag_posting(tag_id) for tag_id in tag_ids]
+            if not bitmaps:
+                continue
+            positions = np.flatnonzero(np.unpackbits(np.bitwise_or.reduce(bitmaps), count=len(self)))
+            matched_posts.append(np.unique(self.post_ids[positions]))
+
+        if not matched_posts:
+            return []
+
+        post_ids, counts = np.unique(np.concatenate(matched_posts), return_counts=True)
+        order = np.lexsort((-post_ids, -counts))[:k]
+        return [(int(post_ids[i]), int(counts[i])) for i in order]
+
+
+class _Vocabulary:
+    """Dense integer codes for the distinct values of a text column, None is -1."""
+
+    def __init__(self):
+        self.lookup = {}
+        self.names = []
+
+    def codes(self, values):
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if value is None:
+                codes[i] = -1
+                continue
+            if value not in self.lookup:
+                self.lookup[value] = len(self.names)
+                self.names.append(value)
+            codes[i] = self.lookup[value]
+        return codes
+
+
+# One index per container, kept across warm invocations
+_item_index = ItemIndex()
+
+def get_item_index(session, load_new=False):
+    """
+    The container's item index, rebuilt or topped up first if it is due.
+    load_new tops it up regardless, e.g. when the caller knows items were added.
+    """
+    _item_index.refresh(session, load_new)
+    return _item_index
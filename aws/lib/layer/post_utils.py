@@ -0,0 +1,113 @@
+from collections import defaultdict
+from datetime import datetime, date
+from sqlalchemy import select, update
+from dripdrop_orm_objects import Post, User, Image, Like, Bookmark
+
+POST_COUNTERS = ("likeCount", "commentCount", "bookmarkCount")
+
+
+def _format_date(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def serialize_posts(session, post_ids, userID=None):
+    """
+    Serialize the given posts with a fixed number of set-based queries.
+
+    Returns the posts in the same order as post_ids. When userID is given the
+    viewer's userHasLiked / userHasSaved flags are included as well.
+    """
+    post_ids = list(dict.fromkeys(int(post_id) for post_id in post_ids))
+    if not post_ids:
+        return []
+
+    # Posts and their authors
+    rows = session.execute(
+        select(
+            Post.postID,
+            Post.status,
+            Post.caption,
+            Post.createdDate,
+            Post.likeCount,
+            Post.commentCount,
+            User.uuid,
+            User.username,
+            User.profilePicURL,
+        )
+        .outerjoin(User, User.userID == Post.userID)
+        .where(Post.postID.in_(post_ids))
+    ).all()
+
+    # Images for every post
+    images = defaultdict(list)
+    for postID, imageID, imageURL in session.execute(
+        select(Image.postID, Image.imageID, Image.imageURL)
+        .where(Image.postID.in_(post_ids))
+        .order_by(Image.imageID)
+    ):
+        images[postID].append({"imageID": imageID, "imageURL": imageURL})
+
+    serialized = {}
+    for postID, status, caption, createdDate, likeCount, commentCount, uuid, username, profilePicURL in rows:
+        post_data = {
+            "postID": postID,
+            "uuid": uuid,
+            "username": username,
+            "status": status,
+            "caption": caption,
+            "createdDate": _format_date(createdDate),
+            "images": images.get(postID, []),
+            "numLikes": likeCount,
+            "numComments": commentCount,
+            "user": {
+                "username": username,
+                "profilePic": profilePicURL,
+            },
+        }
+        serialized[postID] = post_data
+
+    posts = [serialized[post_id] for post_id in post_ids if post_id in serialized]
+    if userID is not None:
+        return add_viewer_flags(session, posts, userID)
+    return posts
+
+
+def add_viewer_flags(session, posts, userID):
+    """
+    Return copies of already serialized posts with the viewer's userHasLiked /
+    userHasSaved flags, so viewer independent payloads (e.g. cached ones) can be
+    shared between users.
+    """
+    post_ids = [post["postID"] for post in posts]
+    if not post_ids:
+        return []
+
+    liked = set(session.execute(
+        select(Like.postID).where(Like.userID == int(userID), Like.postID.in_(post_ids))
+    ).scalars())
+    saved = set(session.execute(
+        select(Bookmark.postID).where(Bookmark.userID == int(userID), Bookmark.postID.in_(post_ids))
+    ).scalars())
+
+    return [
+        {**post, "userHasLiked": post["postID"] in liked, "userHasSaved": post["postID"] in saved}
+        for post in posts
+    ]
+
+
+def update_post_counter(session, postID, counter, delta):
+    """
+    Atomically adjust one of the denormalized counters on a post.
+    Decrements never take a counter below zero.
+    """
+    if counter not in POST_COUNTERS:
+        raise ValueError(f"Unknown post counter: {counter}")
+
+    column = getattr(Post, counter)
+    session.execute(
+        update(Post)
+        .where(Post.postID == postID, column + delta >= 0)
+        .values({column: column + delta})
+    )
@@ -0,0 +1,48 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete
+from sqlalchemy_utils import insert_ignore
+from dripdrop_orm_objects import RecommendationCache
+
+# Cached recommendations are recomputed after this long even without new items
+RECOMMENDATION_CACHE_TTL_SECONDS = int(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", 600))
+
+
+def get_cache_entry(session, clothingItemID):
+    return session.get(RecommendationCache, clothingItemID)
+
+
+def is_fresh(entry):
+    return entry is not None and datetime.now() - entry.createdAt < timedelta(seconds=RECOMMENDATION_CACHE_TTL_SECONDS)
+
+
+def store_recommendations(session, clothingItemID, itemType, post_ids, entry=None):
+    """
+    Save the ranked post IDs recommended for an item. Pass the expired
+    entry if one was read; otherwise the row is inserted, and a concurrent
+    request that stored it first wins.
+    """
+    now = datetime.now()
+    if entry is not None:
+        entry.itemType, entry.postIDs, entry.createdAt = itemType, post_ids, now
+        return
+
+    session.execute(
+        insert_ignore(session, RecommendationCache).values(
+            clothingItemID=clothingItemID,
+            itemType=itemType,
+            postIDs=post_ids,
+            createdAt=now,
+        )
+    )
+
+
+def invalidate_recommendations(session, item_types):
+    """Drop cached recommendations for every item of the given types, new items of a type can rank anywhere."""
+    item_types = {item_type for item_type in item_types if item_type}
+    if not item_types:
+        return
+
+    session.execute(
+        delete(RecommendationCache).where(RecommendationCache.itemType.in_(item_types))
+    )
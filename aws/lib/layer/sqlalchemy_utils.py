@@ -1,11 +1,14 @@
-__all__ = ['session_scope', 'get_user_by_email', 'get_user_by_sub']
+__all__ = ['session_scope', 'get_user_by_email', 'get_user_by_sub', 'insert_ignore']
 
 import os
 import json
+import time
+import heapq
+import threading
 import boto3
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert, event
+from sqlalchemy.engine import URL, Engine
 from sqlalchemy.orm import sessionmaker
-from dripdrop_orm_objects import Base
 from dripdrop_orm_objects import User
 from contextlib import contextmanager
 from functools import wraps
@@ -16,61 +19,251 @@ DB_ENDPOINT = os.getenv("DB_ENDPOINT")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 DB_SECRET_ARN = os.getenv("DB_SECRET_ARN")
+DB_SECRET_TTL_SECONDS = int(os.getenv("DB_SECRET_TTL_SECONDS", 900))
 
-# Cache engine (thread-safe)
+# Optional per-endpoint limit on SQL statements per invocation.
+# Over-budget invocations are logged, or rolled back and failed when strict.
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", 0)) or None
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() == "true"
+SLOWEST_QUERIES_LOGGED = 3
+
+# MySQL error code for rejected credentials, e.g. after a secret rotation
+ACCESS_DENIED_ERROR = 1045
+
+# Cache engine and session factory per container.
+# Schema creation is done by manage-db/create-tables.py, never on the request path.
 _engine = None
+_SessionLocal = None
+_secrets_client = None
+
+def _get_secrets_client():
+    global _secrets_client
+    if _secrets_client is None:
+        _secrets_client = boto3.client('secretsmanager')
+    return _secrets_client
 
-def _get_db_credentials(secret_arn):
-    secrets_client = boto3.client('secretsmanager')
+def get_db_credentials(secret_arn):
     try:
-        response = secrets_client.get_secret_value(SecretId=secret_arn)
+        response = _get_secrets_client().get_secret_value(SecretId=secret_arn)
         secret_data = json.loads(response['SecretString'])
         return secret_data
     except Exception as e:
         print(f"Error retrieving secret: {str(e)}")
         return None
 
-def _get_connection_string(user, password, db_endpoint, db_port, db_name):
-    return f"mysql+pymysql://{user}:{password}@{db_endpoint}:{db_port}/{db_name}"
+
+class CredentialCache:
+    """
+    Keeps the database secret for warm invocations.
+
+    Once the TTL has passed the cached value is still served while a background
+    thread fetches a fresh copy. refresh(force=True) fetches synchronously and is
+    used when the database rejects the cached credentials.
+    """
+
+    def __init__(self, secret_arn, ttl_seconds):
+        self.secret_arn = secret_arn
+        self.ttl_seconds = ttl_seconds
+        self._creds = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    def _is_fresh(self):
+        return self._creds is not None and time.monotonic() - self._fetched_at < self.ttl_seconds
+
+    def get(self):
+        if self._creds is None:
+            return self.refresh()
+        if not self._is_fresh():
+            self.refresh_in_background()
+        return self._creds
+
+    def refresh(self, force=False):
+        with self._lock:
+            if force or not self._is_fresh():
+                creds = get_db_credentials(self.secret_arn)
+                if creds:
+                    self._creds = creds
+                    self._fetched_at = time.monotonic()
+            return self._creds
+
+    def refresh_in_background(self):
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self.refresh, daemon=True)
+        self._refresh_thread.start()
+
+
+_credential_cache = CredentialCache(DB_SECRET_ARN, DB_SECRET_TTL_SECONDS)
+
+# Start fetching the secret while the handler module is still being imported
+if DB_SECRET_ARN:
+    _credential_cache.refresh_in_background()
+
+
+def get_connection_string(user, password, db_endpoint, db_port, db_name):
+    return URL.create(
+        "mysql+pymysql",
+        username=user,
+        password=password,
+        host=db_endpoint,
+        port=int(db_port) if db_port else None,
+        database=db_name,
+    )
+
+def create_db_engine(db_url):
+    return create_engine(
+        db_url,
+        echo=False,
+        pool_size=1,
+        max_overflow=0,
+        pool_recycle=3600,
+        pool_pre_ping=True,
+        pool_use_lifo=True
+    )
+
+def _is_access_denied(error):
+    return bool(error.args) and error.args[0] == ACCESS_DENIED_ERROR
+
+def _use_cached_credentials(engine, credential_cache):
+    """Every new DBAPI connection takes the current credentials, re-fetching them once if rejected."""
+
+    def set_credentials(cparams, creds):
+        if not creds:
+            raise Exception("500", "Error retrieving database credentials")
+        cparams["user"], cparams["password"] = creds["username"], creds["password"]
+
+    @event.listens_for(engine, "do_connect")
+    def connect_with_cached_credentials(dialect, connection_record, cargs, cparams):
+        set_credentials(cparams, credential_cache.get())
+        try:
+            return dialect.connect(*cargs, **cparams)
+        except dialect.loaded_dbapi.OperationalError as e:
+            if not _is_access_denied(e):
+                raise
+            print("Database rejected cached credentials, refreshing secret")
+            set_credentials(cparams, credential_cache.refresh(force=True))
+            return dialect.connect(*cargs, **cparams)
 
 def _get_engine():
     global _engine
     if _engine is None:
-        creds = _get_db_credentials(DB_SECRET_ARN)
+        timings = {}
+        start = time.perf_counter()
+
+        creds = _credential_cache.get()
         if not creds:
             raise Exception("500", "Error retrieving database credentials")
-        db_url = _get_connection_string(creds['username'], creds['password'], DB_ENDPOINT, DB_PORT, DB_NAME)
-        _engine = create_engine(
-            db_url,
-            echo=False,
-            pool_size=1,
-            max_overflow=0,
-            pool_recycle=3600,
-            pool_pre_ping=True,
-            pool_use_lifo=True
-        )
-        # Create tables if needed
-        Base.metadata.create_all(_engine)
+        timings["secretsMs"] = (time.perf_counter() - start) * 1000
+
+        step = time.perf_counter()
+        # The password is supplied per connection by the credential cache
+        db_url = get_connection_string(creds['username'], None, DB_ENDPOINT, DB_PORT, DB_NAME)
+        engine = create_db_engine(db_url)
+        _use_cached_credentials(engine, _credential_cache)
+        timings["engineMs"] = (time.perf_counter() - step) * 1000
+
+        # Open the pooled connection now so its cost shows up in the breakdown
+        step = time.perf_counter()
+        with engine.connect():
+            pass
+        timings["connectMs"] = (time.perf_counter() - step) * 1000
+
+        timings["totalMs"] = (time.perf_counter() - start) * 1000
+        print(json.dumps({"event": "dbColdStart", **{k: round(v, 2) for k, v in timings.items()}}))
+
+        _engine = engine
     return _engine
 
+def _get_session_factory():
+    global _SessionLocal
+    if _SessionLocal is None:
+        _SessionLocal = sessionmaker(bind=_get_engine())
+    return _SessionLocal
+
 def _create_session():
-    engine = _get_engine()
-    SessionLocal = sessionmaker(bind=engine)
-    return SessionLocal()
+    return _get_session_factory()()
+
+
+class QueryStats:
+    """SQL statements issued during one session_handler invocation."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self._slowest = []
+
+    def record(self, statement, elapsed_ms):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        entry = (elapsed_ms, self.count, " ".join(statement.split())[:200])
+        if len(self._slowest) < SLOWEST_QUERIES_LOGGED:
+            heapq.heappush(self._slowest, entry)
+        else:
+            heapq.heappushpop(self._slowest, entry)
+
+    @property
+    def slowest(self):
+        return [
+            {"ms": round(ms, 2), "statement": statement}
+            for ms, _, statement in sorted(self._slowest, reverse=True)
+        ]
+
+
+# Stats of the invocation currently running, if any
+_query_stats = None
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_times"].pop()
+    if _query_stats is not None:
+        _query_stats.record(statement, (time.perf_counter() - start) * 1000)
+
+def _log_query_stats(func_name, stats, wall_ms, committed):
+    print(json.dumps({
+        "event": "sqlStats",
+        "function": func_name,
+        "queries": stats.count,
+        "dbTimeMs": round(stats.total_ms, 2),
+        "wallTimeMs": round(wall_ms, 2),
+        "slowest": stats.slowest,
+        "committed": committed,
+        "queryBudget": QUERY_BUDGET,
+        "overBudget": QUERY_BUDGET is not None and stats.count > QUERY_BUDGET,
+    }))
+
 
 def session_handler(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
+        global _query_stats
         session = _create_session()
+        outer_stats, _query_stats = _query_stats, QueryStats()
+        stats = _query_stats
+        start = time.perf_counter()
+        committed = False
         try:
             result = func(session, *args, **kwargs)
+            # Flush pending adds first so their INSERTs count towards the budget
+            session.flush()
+            if QUERY_BUDGET_STRICT and QUERY_BUDGET is not None and stats.count > QUERY_BUDGET:
+                raise Exception("500", f"{func.__name__} issued {stats.count} queries, budget is {QUERY_BUDGET}")
             session.commit()
+            committed = True
             return result
         except Exception:
             session.rollback()
             raise
         finally:
+            _query_stats = outer_stats
             session.close()
+            # One line per invocation, after commit or rollback so every statement is counted
+            _log_query_stats(func.__name__, stats, (time.perf_counter() - start) * 1000, committed)
     return wrapper
 
 
@@ -79,4 +272,12 @@ def get_user_by_email(session, email):
         return session.query(User).filter_by(email=email).first()
     except Exception as e:
         print(f"Error fetching user by email: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+
+def insert_ignore(session, model):
+    """INSERT that silently skips rows violating a unique or primary key constraint."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "sqlite":
+        return insert(model).prefix_with("OR IGNORE")
+    return insert(model).prefix_with("IGNORE")
@@ -0,0 +1,52 @@
+from sqlalchemy import select, event
+from sqlalchemy_utils import insert_ignore
+from dripdrop_orm_objects import Tag
+
+
+def normalize_tag(tag_value):
+    """Tags are stored lower case (see Tag.convert_lower)."""
+    return str(tag_value).lower()
+
+
+class TagCache:
+    """
+    Tag string -> tagID for the container's lifetime. The tag vocabulary is
+    small and fixed, so the whole table is loaded on first use and known tags
+    cost no queries afterwards.
+
+    Tags inserted by an invocation only enter the cache once its transaction
+    commits, so a rolled back batch never leaves IDs behind that don't exist.
+    """
+
+    def __init__(self):
+        self._ids = None
+
+    def invalidate(self):
+        self._ids = None
+
+    def resolve(self, session, tag_values):
+        """Map tag strings to tagIDs, inserting unknown tags. Blank values are skipped."""
+        if self._ids is None:
+            self._ids = dict(session.execute(select(Tag.tag, Tag.tagID)).all())
+
+        values = {normalize_tag(value) for value in tag_values if str(value).strip()}
+        tag_ids = {value: self._ids[value] for value in values if value in self._ids}
+
+        missing = values - tag_ids.keys()
+        if missing:
+            # IGNORE skips tags another container inserted in the meantime;
+            # reading the missing ones back covers both cases
+            session.execute(insert_ignore(session, Tag), [{"tag": value} for value in missing])
+            new_ids = dict(session.execute(select(Tag.tag, Tag.tagID).where(Tag.tag.in_(missing))).all())
+            tag_ids.update(new_ids)
+
+            @event.listens_for(session, "after_commit", once=True)
+            def publish_new_tags(session):
+                if self._ids is not None:
+                    self._ids.update(new_ids)
+
+        return tag_ids
+
+
+# One cache per container, kept across warm invocations
+tag_cache = TagCache()
@@ -0,0 +1,126 @@
+import os
+import time
+import numpy as np
+from sqlalchemy import select
+from dripdrop_orm_objects import User
+
+# Full reload, picks up renames, deletions and follower counts
+USERNAME_INDEX_REBUILD_SECONDS = int(os.getenv("USERNAME_INDEX_REBUILD_SECONDS", 600))
+
+# Users created since the last load are picked up this often
+USERNAME_INDEX_REFRESH_SECONDS = int(os.getenv("USERNAME_INDEX_REFRESH_SECONDS", 30))
+
+
+class UsernameIndex:
+    """
+    Lowercased usernames in sorted order with their userID and follower count,
+    so a prefix is a binary-searched slice. Names are kept as Python strings
+    (dtype=object) rather than fixed-width numpy strings, which would use 4
+    bytes per character of the longest username for every user. Users created after the last
+    rebuild are kept in small unsorted arrays and scanned linearly.
+    """
+
+    def __init__(self):
+        self.names = np.empty(0, dtype=object)
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.follower_counts = np.empty(0, dtype=np.int64)
+        self._clear_recent()
+        # time.monotonic() of the last rebuild / load, None until first use
+        self.built_at = None
+        self.refreshed_at = None
+        self.max_user_id = 0
+
+    def _clear_recent(self):
+        self.recent_names = np.empty(0, dtype=object)
+        self.recent_user_ids = np.empty(0, dtype=np.int64)
+        self.recent_follower_counts = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.user_ids) + len(self.recent_user_ids)
+
+    def refresh(self, session):
+        now = time.monotonic()
+        if self.built_at is None or now - self.built_at >= USERNAME_INDEX_REBUILD_SECONDS:
+            self.rebuild(session)
+        elif now - self.refreshed_at >= USERNAME_INDEX_REFRESH_SECONDS:
+            self.load_new_users(session)
+
+    def _load(self, session, after):
+        rows = session.execute(
+            select(User.userID, User.username, User.followerCount)
+            .where(User.userID > after)
+            .order_by(User.userID)
+        ).all()
+        self.refreshed_at = time.monotonic()
+
+        if not rows:
+            return None
+
+        user_ids, usernames, follower_counts = zip(*rows)
+        self.max_user_id = max(self.max_user_id, user_ids[-1])
+        return (
+            np.array([username.lower() for username in usernames], dtype=object),
+            np.array(user_ids, dtype=np.int64),
+            np.array(follower_counts, dtype=np.int64),
+        )
+
+    def rebuild(self, session):
+        start = time.perf_counter()
+        self.max_user_id = 0
+        self._clear_recent()
+        loaded = self._load(session, 0)
+        self.built_at = self.refreshed_at
+
+        if loaded is None:
+            loaded = (np.empty(0, dtype=object), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+        names, user_ids, follower_counts = loaded
+        order = np.argsort(names, kind="stable")
+        self.names, self.user_ids, self.follower_counts = names[order], user_ids[order], follower_counts[order]
+        print(f"Username index rebuilt with {len(self)} users in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    def load_new_users(self, session):
+        loaded = self._load(session, self.max_user_id)
+        if loaded is None:
+            return 0
+
+        names, user_ids, follower_counts = loaded
+        self.recent_names = np.concatenate([self.recent_names, names])
+        self.recent_user_ids = np.concatenate([self.recent_user_ids, user_ids])
+        self.recent_follower_counts = np.concatenate([self.recent_follower_counts, follower_counts])
+        return len(user_ids)
+
+    def prefix_matches(self, prefix):
+        """(userIDs, follower counts) of every user whose username starts with prefix, case-insensitively."""
+        prefix = prefix.lower()
+        start = np.searchsorted(self.names, prefix, side="left")
+        end = np.searchsorted(self.names, prefix + "\U0010ffff", side="left")
+
+        recent = np.fromiter((name.startswith(prefix) for name in self.recent_names), dtype=bool, count=len(self.recent_names))
+        return (
+            np.concatenate([self.user_ids[start:end], self.recent_user_ids[recent]]),
+            np.concatenate([self.follower_counts[start:end], self.recent_follower_counts[recent]]),
+        )
+
+    def top_matches(self, prefix, k, exclude_user_id=None):
+        """Up to k userIDs starting with prefix, by follower count (as of the last load), highest first."""
+        user_ids, follower_counts = self.prefix_matches(prefix)
+        if exclude_user_id is not None:
+            keep = user_ids != exclude_user_id
+            user_ids, follower_counts = user_ids[keep], follower_counts[keep]
+
+        if len(follower_counts) > k:
+            top = np.argpartition(-follower_counts, k)[:k]
+        else:
+            top = np.arange(len(follower_counts))
+        top = top[np.argsort(-follower_counts[top], kind="stable")]
+        return [int(user_id) for user_id in user_ids[top]]
+
+
+# One index per container, kept across warm invocations
+_username_index = UsernameIndex()
+
+def get_username_index(session):
+    """The container's username index, rebuilt or topped up first if it is due."""
+    _username_index.refresh(session)
+    return _username_index
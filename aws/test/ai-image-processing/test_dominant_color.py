@@ -0,0 +1,70 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+SEGMENT_SRC = Path(__file__).resolve().parents[2] / "lib" / "lambdas" / "ai-image-processing" / "segment" / "src"
+sys.path.insert(0, str(SEGMENT_SRC))
+
+from color import dominant_color
+
+
+def rgb(color):
+    return np.array([color["red"], color["green"], color["blue"]])
+
+
+def noisy_crop(rng, main_bgr, other_bgr, main_share, shape=(240, 180)):
+    """Crop where main_share of the pixels are main_bgr, the rest other_bgr, plus noise."""
+    image = np.empty((*shape, 3), dtype=np.float32)
+    image[:] = other_bgr
+    image.reshape(-1, 3)[rng.random(shape[0] * shape[1]) < main_share] = main_bgr
+    image += rng.normal(0, 5, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+def test_uniform_image():
+    image = np.full((50, 40, 3), (30, 60, 200), dtype=np.uint8)  # BGR
+    assert dominant_color(image) == {"red": 200, "green": 60, "blue": 30}
+
+
+def test_mask_selects_pixels():
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    image[:, :30] = (0, 0, 255)  # red strip, inside the mask
+    image[:, 30:] = (255, 0, 0)  # larger blue area, outside the mask
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    mask[:, :30] = 1
+
+    assert dominant_color(image, mask) == {"red": 255, "green": 0, "blue": 0}
+    assert dominant_color(image) == {"red": 0, "green": 0, "blue": 255}
+
+
+def test_empty_mask():
+    image = np.zeros((10, 10, 3), dtype=np.uint8)
+    assert dominant_color(image, np.zeros((10, 10))) == {"red": 0, "green": 0, "blue": 0, "error": "Empty masked image"}
+
+
+def test_majority_color_wins():
+    rng = np.random.default_rng(1)
+    image = noisy_crop(rng, (40, 160, 90), (200, 30, 30), main_share=0.6)
+    assert np.abs(rgb(dominant_color(image)) - (90, 160, 40)).max() <= 4
+
+
+def test_at_least_as_accurate_as_kmeans():
+    KMeans = pytest.importorskip("sklearn.cluster").KMeans
+    rng = np.random.default_rng(2)
+
+    for _ in range(10):
+        main, other = rng.integers(0, 256, (2, 3))
+        image = noisy_crop(rng, main, other, main_share=rng.uniform(0.55, 0.8))
+        truth = main[::-1]
+
+        # What segment/src/util.py computed before color.py
+        kmeans = KMeans(n_clusters=3, n_init=10, random_state=0).fit(np.float32(image.reshape(-1, 3)))
+        _, counts = np.unique(kmeans.labels_, return_counts=True)
+        kmeans_rgb = kmeans.cluster_centers_[np.argmax(counts)][::-1]
+
+        histogram_error = np.linalg.norm(rgb(dominant_color(image)) - truth)
+        assert histogram_error < 5
+        assert histogram_error <= np.linalg.norm(kmeans_rgb - truth) + 2
+
@@ -0,0 +1,123 @@
+"""
+Checks that the ONNX Runtime backend (INFERENCE_BACKEND=onnx) returns the
+same detections and attributes as the Ultralytics models. The parity tests
+need ultralytics, torch and onnxruntime, plus the .onnx files from
+export_onnx.py, and are skipped otherwise.
+
+    python -m pytest test/ai-image-processing
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+AI_DIR = Path(__file__).resolve().parents[2] / "lib" / "lambdas" / "ai-image-processing"
+SEGMENT_SRC = AI_DIR / "segment" / "src"
+CLASSIFICATION_SRC = AI_DIR / "classification" / "src"
+sys.path[:0] = [str(SEGMENT_SRC), str(CLASSIFICATION_SRC)]
+
+SEGMENTATION_MODEL = SEGMENT_SRC / "segmentation-model.pt"
+CLASSIFICATION_MODELS = sorted((CLASSIFICATION_SRC / "models").glob("*.pt"))
+
+# Sample photos shipped with Ultralytics
+SAMPLE_IMAGE_NAMES = ["bus.jpg", "zidane.jpg"]
+
+
+def require_backends():
+    """ultralytics and torch modules; skips the test unless both backends are installed."""
+    pytest.importorskip("onnxruntime")
+    return pytest.importorskip("ultralytics"), pytest.importorskip("torch")
+
+
+def require_export(model_path):
+    onnx_path = model_path.with_suffix(".onnx")
+    if not model_path.exists() or not onnx_path.exists():
+        pytest.skip(f"{model_path.name} or its ONNX export is missing, run export_onnx.py")
+    return onnx_path
+
+
+def load_classification_util(monkeypatch):
+    """
+    classification/src/util.py without any models loaded; it reads
+    attributes.json from the cwd. With the onnx backend and no models it
+    imports neither onnxruntime nor torch.
+    """
+    monkeypatch.chdir(CLASSIFICATION_SRC)
+    monkeypatch.setenv("MODEL_NAMES", "")
+    monkeypatch.setenv("INFERENCE_BACKEND", "onnx")
+    spec = importlib.util.spec_from_file_location("classification_util", CLASSIFICATION_SRC / "util.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def box_iou(a, b):
+    width = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    height = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union
+
+
+@pytest.mark.parametrize("image_name", SAMPLE_IMAGE_NAMES)
+def test_segmentation_matches_ultralytics(image_name):
+    ultralytics, torch = require_backends()
+    from onnx_segmentation import OnnxSegmentationModel
+    onnx_path = require_export(SEGMENTATION_MODEL)
+    image = cv2.resize(cv2.imread(str(ultralytics.utils.ASSETS / image_name)), (640, 640))
+
+    result = ultralytics.YOLO(str(SEGMENTATION_MODEL))(image, verbose=False)[0]
+    expected_boxes = torch.cat([result.boxes.xyxy, result.boxes.conf[:, None], result.boxes.cls[:, None]], 1).numpy()
+    expected_masks = result.masks.data.numpy() if result.masks is not None else np.zeros((0, 640, 640))
+
+    detections = OnnxSegmentationModel(str(onnx_path))([image])[0]
+    boxes, masks = np.array(detections["boxes"]).reshape(-1, 6), detections["masks"]
+
+    assert len(boxes) == len(expected_boxes)
+    assert masks.shape == expected_masks.shape
+    for box, expected_box, mask, expected_mask in zip(boxes, expected_boxes, masks, expected_masks):
+        assert box[5] == expected_box[5]
+        assert box[4] == pytest.approx(expected_box[4], abs=1e-3)
+        assert box_iou(box, expected_box) > 0.99
+
+        overlap = np.logical_and(mask, expected_mask).sum() / max(np.logical_or(mask, expected_mask).sum(), 1)
+        assert overlap > 0.97
+
+
+@pytest.mark.parametrize("model_path", CLASSIFICATION_MODELS, ids=lambda path: path.name)
+def test_classification_matches_ultralytics(model_path, monkeypatch):
+    ultralytics, torch = require_backends()
+    from onnx_classification import OnnxClassificationModel, top5
+    onnx_path = require_export(model_path)
+    util = load_classification_util(monkeypatch)
+
+    rng = np.random.default_rng(0)
+    crops = [cv2.imread(str(path)) for path in (ultralytics.utils.ASSETS / name for name in SAMPLE_IMAGE_NAMES)]
+    crops += [rng.integers(0, 256, (h, w, 3), dtype=np.uint8) for h, w in [(120, 80), (300, 410)]]
+    batch = util.preprocess_batch(crops)
+
+    expected = ultralytics.YOLO(str(model_path))(torch.from_numpy(batch), verbose=False)
+    probs = OnnxClassificationModel(str(onnx_path))(batch)
+
+    for (indices, scores), result in zip(top5(probs), expected):
+        assert indices == list(result.probs.top5)
+        assert scores == pytest.approx(result.probs.top5conf.tolist(), abs=1e-4)
+
+
+def test_classification_preprocessing(monkeypatch):
+    util = load_classification_util(monkeypatch)
+    crop = np.zeros((50, 30, 3), dtype=np.uint8)
+    crop[..., 0] = 255  # pure blue in BGR
+
+    batch = util.preprocess_batch([crop, crop])
+
+    assert batch.shape == (2, 3, 224, 224)
+    assert batch.dtype == np.float32
+    # BGR channel order like the original Ultralytics input, scaled to 0-1
+    assert batch[:, 0].min() == 1.0
+    assert batch[:, 1:].max() == 0.0
@@ -0,0 +1,104 @@
+"""
+Benchmark the histogram dominant-color engine (segment/src/color.py) against
+the KMeans version it replaced, on synthetic clothing crops: a shaded main
+color with noise, a print or second garment, and background outside the
+mask. Reports time per crop for both and how far apart their colors are.
+
+    python test/benchmarks/bench_dominant_color.py
+    python test/benchmarks/bench_dominant_color.py --crops 200 --size 400
+
+Needs scikit-learn for the KMeans side.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+SEGMENT_SRC = Path(__file__).resolve().parents[2] / "lib" / "lambdas" / "ai-image-processing" / "segment" / "src"
+sys.path.insert(0, str(SEGMENT_SRC))
+
+from color import dominant_color
+
+
+def kmeans_dominant_color(image, mask=None, k=3):
+    """The KMeans implementation segment/src/util.py used before color.py."""
+    pixels = image[mask.astype(bool)] if mask is not None else image.reshape((-1, 3))
+    kmeans = KMeans(n_clusters=k, n_init=10)
+    kmeans.fit(np.float32(pixels))
+    _, counts = np.unique(kmeans.labels_, return_counts=True)
+    dominant = kmeans.cluster_centers_[np.argmax(counts)]
+    return {"red": int(dominant[2]), "green": int(dominant[1]), "blue": int(dominant[0])}
+
+
+def synthetic_crop(rng, size):
+    """(BGR crop, mask, main color) with the main color covering most of the mask."""
+    height, width = size, int(size * rng.uniform(0.6, 1.0))
+    main = rng.integers(0, 256, 3)
+    second = rng.integers(0, 256, 3)
+    background = rng.integers(0, 256, 3)
+
+    image = np.empty((height, width, 3), dtype=np.float32)
+    image[:] = background
+
+    # Elliptical garment with vertical shading
+    rows, cols = np.mgrid[:height, :width]
+    mask = ((rows - height / 2) / (height / 2)) ** 2 + ((cols - width / 2) / (width / 2)) ** 2 <= 1
+    shading = np.linspace(0.9, 1.1, height)[:, None, None]
+    image[mask] = (main * shading.repeat(width, 1))[mask]
+
+    # Stripes of a second color over part of the garment
+    stripes = mask & ((rows // 12) % 3 == 0) & (cols < width * rng.uniform(0.3, 0.7))
+    image[stripes] = second
+
+    image += rng.normal(0, 6, image.shape)
+    return np.clip(image, 0, 255).astype(np.uint8), mask.astype(np.uint8), main
+
+
+def distance(a, b):
+    return float(np.linalg.norm([a["red"] - b["red"], a["green"] - b["green"], a["blue"] - b["blue"]]))
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--crops", type=int, default=50)
+    parser.add_argument("--size", type=int, default=300, help="Crop height in pixels")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    histogram_ms, kmeans_ms, distances, errors_hist, errors_kmeans = [], [], [], [], []
+
+    for _ in range(args.crops):
+        image, mask, main_bgr = synthetic_crop(rng, args.size)
+        truth = {"red": int(main_bgr[2]), "green": int(main_bgr[1]), "blue": int(main_bgr[0])}
+
+        histogram, elapsed = timed(dominant_color, image, mask)
+        histogram_ms.append(elapsed)
+        kmeans, elapsed = timed(kmeans_dominant_color, image, mask)
+        kmeans_ms.append(elapsed)
+
+        distances.append(distance(histogram, kmeans))
+        errors_hist.append(distance(histogram, truth))
+        errors_kmeans.append(distance(kmeans, truth))
+
+    print(f"{args.crops} crops of ~{args.size}px")
+    print(f"{'':<12}{'p50 ms':>10}{'p95 ms':>10}{'mean err':>10}")
+    for name, timings, errors in [("histogram", histogram_ms, errors_hist), ("kmeans", kmeans_ms, errors_kmeans)]:
+        print(f"{name:<12}{np.percentile(timings, 50):>10.2f}{np.percentile(timings, 95):>10.2f}{np.mean(errors):>10.1f}")
+    print(f"speedup {np.median(kmeans_ms) / np.median(histogram_ms):.0f}x, "
+          f"histogram vs kmeans RGB distance: median {np.median(distances):.1f}, "
+          f"p95 {np.percentile(distances, 95):.1f}, max {np.max(distances):.1f}")
+
+
+if __name__ == "__main__":
+    main()
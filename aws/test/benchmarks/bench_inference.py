@@ -0,0 +1,118 @@
+"""
+Compare the Ultralytics and ONNX Runtime inference backends of the image
+processing Lambdas. Each backend runs in a fresh Python process, like a cold
+Lambda container, and reports:
+
+  load      importing util.py, which imports the backend and loads the model(s)
+  first     the first inference, which includes lazy initialisation
+  p50/p95   per-image latency once warm (per batch of crops for classification)
+
+    python test/benchmarks/bench_inference.py
+    python test/benchmarks/bench_inference.py --components segment --iterations 50
+
+Needs ultralytics, onnxruntime and the .onnx files from
+lib/lambdas/ai-image-processing/export_onnx.py.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+AI_DIR = Path(__file__).resolve().parents[2] / "lib" / "lambdas" / "ai-image-processing"
+SOURCE_DIRS = {
+    "segment": AI_DIR / "segment" / "src",
+    "classification": AI_DIR / "classification" / "src",
+}
+BACKENDS = ("ultralytics", "onnx")
+
+# Crops per classification batch, the Lambda's BATCH_SIZE
+CLASSIFICATION_BATCH = 10
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def run_child(component, iterations):
+    """Runs inside the child process, with the component's src/ as the working directory."""
+    import numpy as np
+
+    start = time.perf_counter()
+    sys.path.insert(0, os.getcwd())
+    import util
+    load_ms = (time.perf_counter() - start) * 1000
+
+    rng = np.random.default_rng(0)
+    if component == "segment":
+        image = rng.integers(0, 256, (*util.MODEL_SIZE, 3), dtype=np.uint8)
+        infer = lambda: util.run_inference([image])
+    else:
+        crops = [rng.integers(0, 256, (rng.integers(80, 400), rng.integers(80, 400), 3), dtype=np.uint8)
+                 for _ in range(CLASSIFICATION_BATCH)]
+
+        def infer():
+            batch = util.preprocess_batch(crops)
+            for model in util.models:
+                util.predict(model, batch)
+
+    start = time.perf_counter()
+    infer()
+    first_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        infer()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        "load_ms": load_ms,
+        "first_ms": first_ms,
+        "p50_ms": percentile(timings, 50),
+        "p95_ms": percentile(timings, 95),
+    }))
+
+
+def measure(component, backend, iterations, model_names):
+    env = {**os.environ, "INFERENCE_BACKEND": backend, "MODEL_NAMES": model_names}
+    completed = subprocess.run(
+        [sys.executable, __file__, "--child", component, "--iterations", str(iterations)],
+        cwd=SOURCE_DIRS[component], env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--components", nargs="+", choices=list(SOURCE_DIRS), default=list(SOURCE_DIRS))
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--child", choices=list(SOURCE_DIRS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.iterations)
+        return
+
+    model_names = ",".join(f"models/{path.name}" for path in sorted((SOURCE_DIRS["classification"] / "models").glob("*.pt")))
+
+    print(f"{'component':<16}{'backend':<13}{'load ms':>10}{'first ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for component in args.components:
+        for backend in args.backends:
+            result = measure(component, backend, args.iterations, model_names)
+            if "error" in result:
+                print(f"{component:<16}{backend:<13}  {result['error']}")
+                continue
+            print(f"{component:<16}{backend:<13}{result['load_ms']:>10.0f}{result['first_ms']:>10.1f}"
+                  f"{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import json
+import random
+
+# Synthetic API Gateway events for each handler under lib/lambdas/api-endpoints.
+# Each factory receives the seeded fixture (see bench_handlers.load_fixture) and
+# returns one event; destructive handlers are only run with --include-destructive.
+
+
+def api_event(fixture, body=None, path=None, query=None, email=None):
+    return {
+        "body": json.dumps(body) if body is not None else None,
+        "pathParameters": path or {},
+        "queryStringParameters": query,
+        "requestContext": {
+            "authorizer": {
+                "claims": {"email": email or random.choice(fixture["emails"])}
+            }
+        },
+    }
+
+
+def _post(fixture):
+    return random.choice(fixture["postIDs"])
+
+
+def _uuid(fixture):
+    return random.choice(fixture["uuids"])
+
+
+def _item(fixture):
+    return random.choice(fixture["itemIDs"])
+
+
+def _term(fixture):
+    return random.choice(fixture["searchTerms"])
+
+
+# (handler directory, event factory, destructive)
+CASES = [
+    # Feed
+    ("feed/get-feed", lambda f: api_event(f, path={"uuid": _uuid(f)}, query={"limit": "20"}), False),
+
+    # Posts
+    ("post/get-posts", lambda f: api_event(f), False),
+    ("post/get-post-by-id", lambda f: api_event(f, path={"id": str(_post(f))}), False),
+    ("post/get-posts-by-user-id", lambda f: api_event(f, path={"uuid": _uuid(f)}), False),
+    ("post/search-posts", lambda f: api_event(f, path={"searchString": _term(f)}), False),
+    ("post/get-ai-recommendations", lambda f: api_event(f, path={"id": str(_item(f))}), False),
+    ("post/publish-post", lambda f: api_event(f, path={"id": str(_post(f))}), False),
+    ("post/create-post", lambda f: api_event(f, body={"caption": "benchmark", "images": []}), False),
+    ("post/delete-post", lambda f: api_event(f, path={"id": str(_post(f))}), True),
+
+    # Likes, comments and bookmarks
+    ("like/like-post", lambda f: api_event(f, body={"postId": _post(f)}), False),
+    ("like/unlike-post", lambda f: api_event(f, body={"postId": _post(f)}), True),
+    ("comment/add-comment", lambda f: api_event(f, body={"postId": _post(f), "content": "benchmark"}), False),
+    ("comment/get-comments", lambda f: api_event(f, path={"post-id": str(_post(f))}), False),
+    ("comment/delete-comment", lambda f: api_event(f, path={"comment-id": str(random.choice(f["commentIDs"]))}), True),
+    ("bookmark/create-bookmark", lambda f: api_event(f, body={"postId": _post(f)}), False),
+    ("bookmark/remove-bookmark", lambda f: api_event(f, body={"postId": _post(f)}), True),
+    ("bookmark/get-bookmarks", lambda f: api_event(f), False),
+
+    # Follows
+    ("follow/follow-user", lambda f: api_event(f, body={"followedId": _uuid(f)}), False),
+    ("follow/unfollow-user", lambda f: api_event(f, body={"followedId": _uuid(f)}), True),
+    ("follow/get-followers", lambda f: api_event(f, path={"id": _uuid(f)}), False),
+    ("follow/get-following", lambda f: api_event(f, path={"id": _uuid(f)}), False),
+
+    # Has seen
+    ("has-seen/mark-as-seen", lambda f: api_event(f, body={"postIDs": [_post(f)]}), False),
+    ("has-seen/get-seen-posts-by-user-id", lambda f: api_event(f), False),
+    ("has-seen/get-users-by-post-id", lambda f: api_event(f, path={"id": str(_post(f))}), False),
+    ("has-seen/reset-seen-posts-for-user-id", lambda f: api_event(f), True),
+
+    # Items
+    ("item/get-items", lambda f: api_event(f, path={"post-id": str(_post(f))}), False),
+    ("item/get-item-details", lambda f: api_event(f, query={"ids": ",".join(str(_item(f)) for _ in range(5))}), False),
+    ("item/search-items", lambda f: api_event(f, query={"tags": "denim", "color": "1e3278", "maxPrice": "150"}), False),
+    ("item/delete-item", lambda f: api_event(f, path={"item-id": str(_item(f))}), True),
+
+    # Users
+    ("user/get-users", lambda f: api_event(f), False),
+    ("user/get-user-by-id", lambda f: api_event(f, path={"uuid": _uuid(f)}), False),
+    ("user/get-user-by-username", lambda f: api_event(f, path={"username": random.choice(f["usernames"])}), False),
+    ("user/search-users", lambda f: api_event(f, path={"searchString": random.choice(f["usernames"])[:3]}), False),
+    ("user/delete-user", lambda f: api_event(f), True),
+]
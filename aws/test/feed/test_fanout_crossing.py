@@ -0,0 +1,86 @@
+"""
+Feed fan-out around FANOUT_FOLLOWER_LIMIT, against in-memory SQLite through
+the real unfollow-user and get-feed handlers.
+
+    python -m pytest test/feed
+"""
+
+import datetime
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+AWS_DIR = Path(__file__).resolve().parents[2]
+ENDPOINTS_DIR = AWS_DIR / "lib" / "lambdas" / "api-endpoints"
+sys.path.insert(0, str(AWS_DIR / "lib" / "layer"))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+import feed_utils
+import sqlalchemy_utils
+from dripdrop_orm_objects import Base, User, Post, Follow
+
+
+def import_handler(handler_dir):
+    path = ENDPOINTS_DIR / handler_dir / "handler.py"
+    spec = importlib.util.spec_from_file_location("test_" + handler_dir.replace("/", "_").replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(sqlalchemy_utils, "_engine", engine)
+    monkeypatch.setattr(sqlalchemy_utils, "_SessionLocal", None)
+    monkeypatch.setattr(feed_utils, "FANOUT_FOLLOWER_LIMIT", 2)
+    return engine
+
+
+def add_user(session, name, follower_count=0):
+    user = User(uuid=name, username=name, email=f"{name}@example.com",
+                dob=datetime.date(2000, 1, 1), followerCount=follower_count)
+    session.add(user)
+    session.flush()
+    return user
+
+
+def test_posts_published_over_the_limit_reach_followers_after_dropping_back(engine):
+    get_feed = import_handler("feed/get-feed")
+    unfollow_user = import_handler("follow/unfollow-user")
+
+    with Session(engine) as session:
+        author = add_user(session, "author", follower_count=3)
+        viewer, other, leaving = (add_user(session, name) for name in ("viewer", "other", "leaving"))
+        session.add_all(Follow(followerId=user.userID, followedId=author.userID) for user in (viewer, other, leaving))
+
+        post = Post(userID=author.userID, caption="over the limit", status="PUBLIC",
+                    createdDate=datetime.date(2024, 1, 1))
+        session.add(post)
+        session.flush()
+        # Three followers is over the limit of two, so the post is left to fan-out-on-read
+        assert not feed_utils.fanout_post(session, post)
+        session.commit()
+        post_id = post.postID
+
+    # Still over the limit: read from the posts table
+    status, posts = get_feed.getFeed("viewer@example.com")
+    assert status == 200 and post_id in [p["postID"] for p in posts]
+
+    # Back at the limit: the author is fanned out on write again, and the
+    # earlier post must now be in the remaining followers' inboxes
+    assert unfollow_user.deleteFollow("leaving@example.com", "author")[0] == 200
+
+    for email in ("viewer@example.com", "other@example.com"):
+        status, posts = get_feed.getFeed(email)
+        assert status == 200
+        assert [p["postID"] for p in posts] == [post_id]
+
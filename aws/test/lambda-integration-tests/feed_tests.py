@@ -0,0 +1,35 @@
+import requests
+from cognito import get_cognito_token
+
+ACCESS_TOKEN = get_cognito_token()
+headers = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
+BASE_URL = "https://api.dripdropco.com"
+
+def test_get_feed():
+    response = requests.get(f"{BASE_URL}/feed/abc", headers=headers, params={"limit": 5})
+    assert response.status_code == 200
+    assert isinstance(response.json(), list), "Feed without a cursor should be a list of posts"
+
+def test_get_feed_cursor_pages():
+    response = requests.get(f"{BASE_URL}/feed/abc", headers=headers, params={"limit": 5, "cursor": ""})
+    assert response.status_code == 200
+
+    first_page = response.json()
+    assert isinstance(first_page["posts"], list)
+    if not first_page["nextCursor"]:
+        return
+
+    response = requests.get(
+        f"{BASE_URL}/feed/abc",
+        headers=headers,
+        params={"limit": 5, "cursor": first_page["nextCursor"]}
+    )
+    assert response.status_code == 200
+
+    first_ids = {post["postID"] for post in first_page["posts"]}
+    second_ids = {post["postID"] for post in response.json()["posts"]}
+    assert not first_ids & second_ids, "Pages should not overlap"
+
+def test_get_feed_invalid_cursor():
+    response = requests.get(f"{BASE_URL}/feed/abc", headers=headers, params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400